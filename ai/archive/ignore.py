@@ -1,9 +1,11 @@
 import os
 import re
-import subprocess
 
 import yaml
 
+# One shared git check-ignore process for every script
+from ...file.ignore import git_check_ignore
+
 def load_ignore_patterns():
     """
     Load ignore patterns from digital.yml and compile them into regexes.
@@ -33,12 +35,4 @@ def is_ignored(path: str, ignore_regexes) -> bool:
             return True
 
     # Check if path is git-ignored
-    try:
-        result = subprocess.run(
-            ['git', 'check-ignore', '-q', path],
-            capture_output=True,
-            text=True
-        )
-        return result.returncode == 0
-    except subprocess.SubprocessError:
-        return False
+    return git_check_ignore(path)
@@ -1,46 +1,53 @@
 #!/usr/bin/env python3
 import os
 import yaml
+try:
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeLoader, SafeDumper
 from pathlib import Path
 import sys
 import argparse
 from typing import Dict, Optional
+from ..file.utils import map_configs, iter_config_dirs
+
+def read_config(config_path):
+    """
+    Load a config file; returns (config, None), or (None, error) if it cannot be read.
+    """
+    try:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            return yaml.load(f, Loader=SafeLoader), None
+    except Exception as e:
+        return None, e
 
 def find_config_files(root_dir, max_depth=2):
     """
     Recursively find all config.yml files in the given directory up to max_depth
     """
     catalog = {}
-    root_level = root_dir.rstrip('/').count('/')
     
-    for root, dirs, files in os.walk(root_dir):
-        # Skip docs directory
-        if 'docs' in dirs:
-            dirs.remove('docs')
-            
-        # Check current depth
-        current_depth = root.rstrip('/').count('/') - root_level
-        if current_depth > max_depth:
-            dirs.clear()  # Stop going deeper
-            continue
-            
-        if 'config.yml' in files:
-            try:
-                config_path = os.path.join(root, 'config.yml')
-                print(f"Reading {config_path}")
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    config = yaml.safe_load(f)
-                    
-                # Get relative path from root directory
-                rel_path = os.path.relpath(root, root_dir)
-                # Create dictionary with name and description
-                catalog[rel_path] = {
-                    'name': os.path.basename(rel_path),
-                    'description': config.get('description', 'No description available')
-                }
-            except Exception as e:
-                print(f"Error reading {config_path}: {e}")
-                sys.exit(1)  # Exit on error
+    roots = list(iter_config_dirs(root_dir, max_depth))
+    config_paths = [os.path.join(root, 'config.yml') for root in roots]
+    # Parse every config up front; results are then handled in walk order
+    results = map_configs(read_config, config_paths)
+
+    for root, config_path, (config, error) in zip(roots, config_paths, results):
+        try:
+            print(f"Reading {config_path}")
+            if error is not None:
+                raise error
+                
+            # Get relative path from root directory
+            rel_path = os.path.relpath(root, root_dir)
+            # Create dictionary with name and description
+            catalog[rel_path] = {
+                'name': os.path.basename(rel_path),
+                'description': config.get('description', 'No description available')
+            }
+        except Exception as e:
+            print(f"Error reading {config_path}: {e}")
+            sys.exit(1)  # Exit on error
     
     return catalog
 
@@ -50,10 +57,10 @@ def generate_catalog(catalog, output_file):
     """
     try:
         # Sort paths for consistent output
-        sorted_catalog = dict(sorted(catalog.items()))
+        sorted_catalog = {path: catalog[path] for path in sorted(catalog)}
         
         with open(output_file, 'w', encoding='utf-8') as f:
-            yaml.dump(sorted_catalog, f, allow_unicode=True, sort_keys=False)
+            yaml.dump(sorted_catalog, f, Dumper=SafeDumper, allow_unicode=True, sort_keys=False)
     except Exception as e:
         print(f"Error generating catalog file: {e}")
         sys.exit(1)  # Exit on error
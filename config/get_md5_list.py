@@ -1,64 +1,80 @@
 #!/usr/bin/env python3
 import os
 import yaml
+try:
+    from yaml import CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeDumper
 import sys
 import argparse
-import subprocess  # For git check-ignore
-import re  # For regex
+import functools
+import hashlib
+import mmap
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
+from ..file.utils import map_configs, FileKeysConfigLoader
+from ..file.ignore import load_ignore_patterns as _load_ignore_patterns, is_ignored as _is_ignored
 
 def load_ignore_patterns():
     """
     Load ignore patterns from digital.yml and compile them into regexes.
+    Returned as a tuple so is_ignored can cache its answers by (path, regexes).
     """
-    ignore_regexes = []
-    digital_yml_path = 'digital.yml'
-    if os.path.exists(digital_yml_path):
-        with open(digital_yml_path, 'r', encoding='utf-8') as f:
-            digital_config = yaml.safe_load(f)
-            ignore_patterns = digital_config.get('ignore', [])
-            ignore_regexes = [re.compile(pattern) for pattern in ignore_patterns]
+    # Also refreshes the shared git-ignored snapshot
+    ignore_regexes = tuple(_load_ignore_patterns())
+    is_ignored.cache_clear()
     return ignore_regexes
 
+@functools.lru_cache(maxsize=65536)
 def is_ignored(path, ignore_regexes):
     """
     Check if a path matches any ignore pattern or is git-ignored.
+    Cached, so a path that is asked about again costs a dict lookup and its
+    "Ignore:" line is printed only once; ignore_regexes must be a tuple.
     """
-    normalized_path = os.path.normpath(path)
+    return _is_ignored(path, ignore_regexes)
 
-    # Check if any ignore regex matches the path
-    for regex in ignore_regexes:
-        if regex.search(normalized_path):
-            print(f"Ignore: {path} (matched pattern: {regex.pattern})")
-            return True
+def hash_file(file_path):
+    """
+    Calculate the MD5 hash of a file, letting hashlib read it in C with the GIL released.
+    """
+    with open(file_path, 'rb') as f:
+        if hasattr(hashlib, 'file_digest'):
+            return hashlib.file_digest(f, 'md5').hexdigest()
+        # Python < 3.11: hash a read-only mapping of the file in one call
+        md5_hash = hashlib.md5()
+        if os.fstat(f.fileno()).st_size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                md5_hash.update(mapped)
+        return md5_hash.hexdigest()
 
-    # Check if path is git-ignored
-    try:
-        result = subprocess.run(
-            ['git', 'check-ignore', '-q', path],
-            capture_output=True,
-            text=True
-        )
-        return result.returncode == 0
-    except subprocess.SubprocessError:
-        return False
+class MD5ConfigLoader(FileKeysConfigLoader):
+    """Loader that builds only the filename/md5 keys of a config.yml's 'files' entries"""
+    FILE_KEYS = frozenset({'filename', 'md5'})
 
 def find_md5_in_config(config_path, ignore_regexes):
     """
     Extract MD5 values from a config file.
     """
     try:
-        with open(config_path, 'r', encoding='utf-8') as f:
-            config = yaml.safe_load(f)
+        raw = Path(config_path).read_bytes()
+        # Configs without a single md5 entry (navigation-only nodes) need no parsing
+        if b'md5' not in raw:
+            return {}
+        config = yaml.load(raw, Loader=MD5ConfigLoader)
 
         md5_info = {}
         # Look for MD5 values in the files list
         if isinstance(config, dict) and 'files' in config:
+            # Plain string joins; normalized once so paths match what Path() produced
+            config_dir = os.path.normpath(os.path.dirname(config_path))
+            if config_dir == '.':
+                config_dir = ''
             for file_info in config['files']:
                 if 'md5' in file_info and 'filename' in file_info:
-                    config_dir = Path(config_path).parent
-                    file_path = str(config_dir / file_info['filename'])
+                    file_path = os.path.join(config_dir, file_info['filename'])
                     # Check if the file is ignored
                     if not is_ignored(file_path, ignore_regexes):
                         md5_info[file_info['filename']] = {
@@ -73,62 +89,132 @@ def find_md5_in_config(config_path, ignore_regexes):
         print(f"Error reading {config_path}: {e}")
         return {}
 
+# Directory scans are mostly waiting on the filesystem, so use more threads than cores
+WALK_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+def scan_config_dir(path, depth, ignore_regexes, max_depth):
+    """
+    List one directory for the walk: returns (config_path or None, subdirectories
+    to descend into), applying the ignore rules and the depth limit.
+    """
+    if depth > max_depth:
+        return None, []
+
+    subdirs = []
+    config_path = None
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    # Like os.walk, never descend through symlinks; otherwise keep
+                    # directories that are not ignored, as its dirs[:] filter did
+                    if not entry.is_symlink() and not is_ignored(entry.path, ignore_regexes):
+                        subdirs.append(entry.path)
+                elif entry.name == 'config.yml':
+                    config_path = entry.path
+    except OSError:
+        # Unreadable directories are skipped, as os.walk does
+        return None, []
+
+    if config_path is not None and is_ignored(config_path, ignore_regexes):
+        config_path = None
+    return config_path, subdirs
+
+def walk_config_files(root_dir, ignore_regexes, max_depth):
+    """
+    Find config.yml files below root_dir, scanning each level of the tree on a
+    thread pool. Paths are returned in the same top-down order os.walk gives.
+    """
+    # Depth is counted in path separators relative to root_dir as given, so a
+    # root of '.' and its immediate subdirectories all start at the same depth.
+    # Measure the first two levels that way once; below them it is parent + 1.
+    root_level = root_dir.rstrip('/').count('/')
+    root_depth = os.path.normpath(root_dir).rstrip('/').count('/') - root_level
+    top_depth = os.path.normpath(os.path.join(root_dir, 'x')).count('/') - root_level
+
+    tree = {}
+    level = [(root_dir, root_depth)]
+    with ThreadPoolExecutor(max_workers=WALK_WORKERS) as executor:
+        while level:
+            results = executor.map(
+                lambda item: scan_config_dir(item[0], item[1], ignore_regexes, max_depth), level)
+            next_level = []
+            for (path, depth), (config_path, subdirs) in zip(level, results):
+                tree[path] = (config_path, subdirs)
+                child_depth = top_depth if path == root_dir else depth + 1
+                next_level.extend((subdir, child_depth) for subdir in subdirs)
+            level = next_level
+
+    # Replay the scanned tree depth-first so the configs come out in walk order
+    config_paths = []
+    stack = [root_dir]
+    while stack:
+        config_path, subdirs = tree[stack.pop()]
+        if config_path is not None:
+            config_paths.append(config_path)
+        stack.extend(reversed(subdirs))
+    return config_paths
+
 def find_config_files(root_dir, ignore_regexes, max_depth=2):
     """
     Recursively find all config.yml files and extract MD5 information.
     """
     md5_catalog = {}
-    md5_to_files = {}
-    root_level = root_dir.rstrip('/').count('/')
 
-    for root, dirs, files in os.walk(root_dir):
-        normalized_root = os.path.normpath(root)
-
-        # Check if current directory should be ignored
-        if is_ignored(normalized_root, ignore_regexes):
-            dirs[:] = []  # Don't recurse into subdirectories
-            continue
-
-        # Remove ignored directories from dirs
-        dirs[:] = [d for d in dirs if not is_ignored(os.path.join(root, d), ignore_regexes)]
-
-        # Check current depth
-        current_depth = normalized_root.rstrip('/').count('/') - root_level
-        if current_depth > max_depth:
-            dirs.clear()
-            continue
-
-        if 'config.yml' in files:
-            config_path = os.path.join(root, 'config.yml')
-            if is_ignored(config_path, ignore_regexes):
-                continue
-            print(f"Reading {config_path}")
-            md5_info = find_md5_in_config(config_path, ignore_regexes)
-
-            # Check for duplicate MD5 values
-            for file_info in md5_info.values():
-                md5_hash = file_info['md5']
-                if md5_hash in md5_to_files:
-                    print(f"\nWARNING: Duplicate MD5 hash found: {md5_hash}")
-                    print(f"  File 1: {md5_to_files[md5_hash]}")
-                    print(f"  File 2: {file_info['path']}\n")
-                else:
-                    md5_to_files[md5_hash] = file_info['path']
+    # Only the starting directory needs checking here; every directory below
+    # it is vetted by its parent's scan
+    if is_ignored(os.path.normpath(root_dir), ignore_regexes):
+        return md5_catalog
+
+    config_paths = walk_config_files(root_dir, ignore_regexes, max_depth)
+    for config_path in config_paths:
+        print(f"Reading {config_path}")
 
-            md5_catalog.update(md5_info)
+    # Parse the configs, then merge them in walk order
+    results = map_configs(lambda config_path: find_md5_in_config(config_path, ignore_regexes), config_paths)
+    for md5_info in results:
+        md5_catalog.update(md5_info)
 
     return md5_catalog
 
+def _hash_file_or_none(file_path):
+    try:
+        return hash_file(file_path)
+    except OSError:
+        return None
+
+def confirm_duplicates(md5_catalog, duplicates, first_files):
+    """
+    Re-hash suspected duplicates and the files they would be kept in favour of,
+    on a thread pool, and return only the duplicates whose contents really match.
+    A file that cannot be read is judged by its recorded MD5 as before.
+    """
+    pairs = [(md5_catalog[filename]['path'], first_files[md5_catalog[filename]['md5']])
+             for filename in duplicates]
+    paths = list({path for pair in pairs for path in pair})
+    # hashlib releases the GIL while digesting, so threads hash files in parallel
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        digests = dict(zip(paths, executor.map(_hash_file_or_none, paths)))
+
+    confirmed = []
+    for filename, (path, first_path) in zip(duplicates, pairs):
+        digest, first_digest = digests[path], digests[first_path]
+        if digest is None or first_digest is None or digest == first_digest:
+            confirmed.append(filename)
+        else:
+            print(f"Not a duplicate after re-hashing, recorded MD5 is stale: {path}")
+    return confirmed
+
 def generate_md5_catalog(md5_catalog, output_file):
     """
     Generate md5.yml file with file names, paths and MD5 values.
     """
     try:
         # Sort entries for consistent output
-        sorted_catalog = dict(sorted(md5_catalog.items()))
+        sorted_catalog = {filename: md5_catalog[filename] for filename in sorted(md5_catalog)}
 
         with open(output_file, 'w', encoding='utf-8') as f:
-            yaml.dump(sorted_catalog, f, allow_unicode=True, sort_keys=False)
+            yaml.dump(sorted_catalog, f, Dumper=SafeDumper, allow_unicode=True, sort_keys=False)
     except Exception as e:
         print(f"Error generating MD5 catalog file: {e}")
         sys.exit(1)
@@ -163,19 +249,32 @@ def md5_list_main(
         # Find all config files and extract MD5 information
         md5_catalog = find_config_files(base_dir, ignore_regexes, max_depth)
 
-        # Modified duplicate checking and removal logic
-        md5_to_files = {}
-        duplicates_to_remove = set()
+        # Count every MD5 once; only hashes seen more than once need a closer look
+        md5_counts = Counter(info['md5'] for info in md5_catalog.values())
+        duplicates_to_remove = []
         removed_files = []
 
-        # First pass: collect all files with same MD5
-        for filename, info in md5_catalog.items():
-            md5_hash = info['md5']
-            if md5_hash in md5_to_files:
-                md5_to_files[md5_hash].append(filename)
-                duplicates_to_remove.add(filename)
-            else:
-                md5_to_files[md5_hash] = [filename]
+        if any(count > 1 for count in md5_counts.values()):
+            report = fail_on_duplicates or remove_duplicates
+            first_files = {}
+            for filename, info in md5_catalog.items():
+                md5_hash = info['md5']
+                if md5_counts[md5_hash] < 2:
+                    continue
+                if md5_hash not in first_files:
+                    # Keep the first occurrence
+                    first_files[md5_hash] = info['path']
+                    continue
+                duplicates_to_remove.append(filename)
+                if report:
+                    print(f"\nWARNING: Duplicate MD5 hash found: {md5_hash}")
+                    print(f"  File 1: {first_files[md5_hash]}")
+                    print(f"  File 2: {info['path']}\n")
+            if report:
+                # Files are about to be removed or the run failed; make sure the
+                # recorded hashes still describe what is on disk
+                duplicates_to_remove = confirm_duplicates(md5_catalog, duplicates_to_remove, first_files)
+            print(f"Found {len(duplicates_to_remove)} files with duplicate MD5 values")
 
         # Remove duplicates if requested
         if remove_duplicates:
@@ -194,6 +293,8 @@ def md5_list_main(
                 
                 del md5_catalog[duplicate]
                 print(f"Removed duplicate file: {duplicate}")
+            # The removed files no longer exist; drop any answers cached for them
+            is_ignored.cache_clear()
 
         has_duplicates = len(duplicates_to_remove) > 0
         if has_duplicates and fail_on_duplicates and not remove_duplicates:
@@ -12,28 +12,58 @@ def write_json(file_path, data):
     with open(file_path, 'w', encoding='utf-8') as file:
         json.dump(data, file, indent=2, ensure_ascii=False)
 
+def iter_english_pages(docs_dir, prefix=''):
+    """
+    Yield the paths of English .md files under docs_dir, relative to it, in
+    os.walk order. Built on os.scandir so the entry types come from the
+    directory listing and paths are joined as they go, with no relpath calls.
+    """
+    try:
+        with os.scandir(docs_dir) as it:
+            entries = list(it)
+    except OSError:
+        return
+
+    subdirs = []
+    for entry in entries:
+        try:
+            is_dir = entry.is_dir()
+        except OSError:
+            is_dir = False
+        if is_dir:
+            # Like os.walk, symlinked directories are not followed
+            if not entry.is_symlink():
+                subdirs.append(entry)
+        elif entry.name.endswith('.md') and not entry.name.endswith('.zh.md'):
+            yield os.path.join(prefix, entry.name)
+
+    for entry in subdirs:
+        yield from iter_english_pages(entry.path, os.path.join(prefix, entry.name))
+
 def check_and_publish(docs_dir, config_path):
     """Check all English .md files and update publishing information."""
     config = read_json(config_path)
     passages = config.get("passages", {})
     platforms = ["medium", "devto"]
 
-    for root, _, files in os.walk(docs_dir):
-        for file in files:
-            if file.endswith('.md') and not file.endswith('.zh.md'):
-                file_path = os.path.relpath(os.path.join(root, file), docs_dir)
-                if file_path not in passages:
-                    passages[file_path] = {"published": []}
-                elif not isinstance(passages[file_path].get("published"), list):
-                    passages[file_path]["published"] = []
-                
-                # Ensure all platforms are included
-                # for platform in platforms:
-                #     if platform not in passages[file_path]["published"]:
-                #         passages[file_path]["published"].append(platform)
-
-    config["passages"] = passages
-    write_json(config_path, config)
+    changed = "passages" not in config
+    for file_path in iter_english_pages(docs_dir):
+        if file_path not in passages:
+            passages[file_path] = {"published": []}
+            changed = True
+        elif not isinstance(passages[file_path].get("published"), list):
+            passages[file_path]["published"] = []
+            changed = True
+        
+        # Ensure all platforms are included
+        # for platform in platforms:
+        #     if platform not in passages[file_path]["published"]:
+        #         passages[file_path]["published"].append(platform)
+
+    # Most runs find every page already listed; leave the file alone then
+    if changed:
+        config["passages"] = passages
+        write_json(config_path, config)
 
     total_published = sum(1 for passage in passages.values() if passage.get("published"))
     print(f"Total files with publishing information: {total_published}")
@@ -1,54 +1,35 @@
 import os
 import json
-import subprocess
-import tempfile
+from scripts.ai.gen_struct import generate_structured_content
+from scripts.file.utils import write_json
 
 def read_json(file_path):
     """Read and parse JSON file."""
     with open(file_path, 'r', encoding='utf-8') as file:
         return json.load(file)
 
-def write_json(file_path, data):
-    """Write data to JSON file."""
-    with open(file_path, 'w', encoding='utf-8') as file:
-        json.dump(data, file, indent=2, ensure_ascii=False)
-
 def read_file(file_path):
     """Read the content of a file."""
     with open(file_path, 'r', encoding='utf-8') as file:
         return file.read()
 
-def generate_keywords(content, schema_file, gen_struct_path):
-    """Generate keywords using gen_struct.py."""
-    with tempfile.NamedTemporaryFile(mode='w+', delete=False, suffix='.txt') as temp_input:
-        temp_input.write("extract the 5 most important keywords that can be used as topic to publish a blog. No space in the keyword, it shoud be one word. It should be common topics on medium, dev.to, zhihu, etc. The keywords should be in the same language as the content. \n\n")
-        temp_input.write(content)
-        temp_input_path = temp_input.name
-
-    with tempfile.NamedTemporaryFile(mode='w+', delete=False, suffix='.json') as temp_output:
-        temp_output_path = temp_output.name
+KEYWORDS_PROMPT = "extract the 5 most important keywords that can be used as topic to publish a blog. No space in the keyword, it shoud be one word. It should be common topics on medium, dev.to, zhihu, etc. The keywords should be in the same language as the content. \n\n"
 
-    try:
-        subprocess.run([
-            'python', gen_struct_path,
-            temp_input_path, temp_output_path, schema_file
-        ], check=True)
+def generate_keywords(content, schema):
+    """Generate keywords with gen_struct, called in-process."""
+    keywords = generate_structured_content(KEYWORDS_PROMPT + content, schema)
+    return keywords.get('keywords', [])
 
-        keywords = read_json(temp_output_path)
-        return keywords.get('keywords', [])
-    finally:
-        os.unlink(temp_input_path)
-        os.unlink(temp_output_path)
+# Keyword generation is slow, so progress is saved every this many generated passages
+CHECKPOINT_INTERVAL = 10
 
 def main():
     config_path = '.github/config.json'
     docs_dir = 'docs'
-    gen_struct_path = '.github/manage/gen_struct.py'
 
     config = read_json(config_path)
     passages = config.get('passages', {})
 
-    # Create a temporary schema file
     schema = {
         "type": "object",
         "properties": {
@@ -61,26 +42,27 @@ def main():
         "additionalProperties": False
     }
 
-    with tempfile.NamedTemporaryFile(mode='w+', delete=False, suffix='.json') as temp_schema:
-        json.dump(schema, temp_schema)
-        schema_file = temp_schema.name
-
+    generated = 0
     try:
         for file_path, passage_info in passages.items():
             if 'keywords' not in passage_info:
                 full_path = os.path.join(docs_dir, file_path)
                 if os.path.exists(full_path):
                     content = read_file(full_path)
-                    keywords = generate_keywords(content, schema_file, gen_struct_path)
+                    keywords = generate_keywords(content, schema)
                     passage_info['keywords'] = keywords
                     print(f"Generated keywords for {file_path}: {keywords}")
+                    generated += 1
+                    if generated % CHECKPOINT_INTERVAL == 0:
+                        write_json(config_path, config)
                 else:
                     print(f"File not found: {full_path}")
-                write_json(config_path, config)
-        write_json(config_path, config)
-        print("Successfully updated config with keywords.")
     finally:
-        os.unlink(schema_file)
+        # Always save, so keywords generated before a failure are kept
+        write_json(config_path, config)
+    print("Successfully updated config with keywords.")
 
+# Run as a module from the directory above scripts/:
+#   python -m scripts.config.repo.keywords
 if __name__ == "__main__":
     main()
\ No newline at end of file
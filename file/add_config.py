@@ -1,19 +1,23 @@
 from datetime import datetime
 import os
 import yaml
+try:
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeLoader, SafeDumper
 from .ignore import load_ignore_patterns, is_ignored
 
 def load_yaml(file_path):
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
-            return yaml.safe_load(f)
+            return yaml.load(f, Loader=SafeLoader)
     except Exception as e:
         print(f"Error parsing {file_path}: {e}")
         return None
 
 def save_yaml(file_path, data):
     with open(file_path, 'w', encoding='utf-8') as f:
-        yaml.dump(data, f, allow_unicode=True, sort_keys=False)
+        yaml.dump(data, f, Dumper=SafeDumper, allow_unicode=True, sort_keys=False)
 
 def find_md5_in_visit_links(visit_links_data, target_md5):
     """Search for MD5 hash in visit_links.yml content and return the link if found"""
@@ -1,6 +1,10 @@
 import datetime
 import os
 import yaml
+try:
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeLoader, SafeDumper
 import re
 
 def extract_embedded_link(markdown_path):
@@ -18,21 +22,22 @@ def extract_embedded_link(markdown_path):
 def load_yaml(file_path):
     with open(file_path, 'r', encoding='utf-8') as f:
         try:
-            return yaml.safe_load(f)
+            return yaml.load(f, Loader=SafeLoader)
         except yaml.YAMLError as e:
             print(f"Error parsing {file_path}: {e}")
             return None
 
 def save_yaml(file_path, data):
     with open(file_path, 'w', encoding='utf-8') as f:
-        yaml.dump(data, f, allow_unicode=True, sort_keys=False)
+        yaml.dump(data, f, Dumper=SafeDumper, allow_unicode=True, sort_keys=False)
 
 def update_files(root_dir):
 
     # Walk through directories
     for root, dirs, files in os.walk(root_dir):
 
-        if 'config.yml' in files:
+        # Pages are markdown files, so skip config.yml parsing where there are none
+        if 'config.yml' in files and any(f.endswith('.md') for f in files):
             visit_links_path = os.path.join(root, 'page.yml')
             config_path = os.path.join(root, 'config.yml')
             config_data = load_yaml(config_path)
@@ -69,22 +74,24 @@ def update_files(root_dir):
                 if link:
                     page_path = os.path.join(root, file['page'])
                     if os.path.exists(page_path):
-                        with open(page_path, 'r', encoding='utf-8') as f:
+                        # Read, patch and write back through a single handle
+                        with open(page_path, 'r+', encoding='utf-8') as f:
                             content = f.read()
-                        
-                        if "[Unknown link(update needed)]" in content:
-                            print(f"Updating link for {file['name']} in {page_path}")
-                            updated_content = content.replace("[Unknown link(update needed)]", link)
-                            with open(page_path, 'w', encoding='utf-8') as f:
+                            updated_content = content
+                            
+                            if "[Unknown link(update needed)]" in updated_content:
+                                print(f"Updating link for {file['name']} in {page_path}")
+                                updated_content = updated_content.replace("[Unknown link(update needed)]", link)
+                            
+                            if "[Unknown archived date(update needed)]" in updated_content:
+                                print(f"Updating archived date for {file['name']} in {page_path}")
+                                updated_content = updated_content.replace("[Unknown archived date(update needed)]", visited_date)
+                            
+                            if updated_content != content:
+                                f.seek(0)
                                 f.write(updated_content)
-                            print(f"Updated link for {file['name']} in {page_path}")
-                        
-                        if "[Unknown archived date(update needed)]" in content:
-                            print(f"Updating archived date for {file['name']} in {page_path}")
-                            updated_content = content.replace("[Unknown archived date(update needed)]", visited_date)
-                            with open(page_path, 'w', encoding='utf-8') as f:
-                                f.write(updated_content)
-                            print(f"Updated archived date for {file['name']} in {page_path}")
+                                f.truncate()
+                                print(f"Updated {file['name']} in {page_path}")
                 else:
                     print(f"No link found for {file['name']}")
 
@@ -1,28 +1,35 @@
 import os
 import chardet
 
-def detect_encoding(file_path: str) -> str:
-    """Detect the encoding of a file using chardet."""
-    with open(file_path, 'rb') as file:
-        raw_data = file.read()
-        result = chardet.detect(raw_data)
-        return result['encoding'] or 'utf-8'
+def detect_encoding(raw_data: bytes) -> str:
+    """Detect the encoding of already-read file content using chardet."""
+    result = chardet.detect(raw_data)
+    return result['encoding'] or 'utf-8'
 
 def convert_to_utf8(directory: str):
     """Recursively process txt files in the directory to convert them to UTF-8."""
-    fallback_encodings = ['utf-8', 'gb2312', 'gbk', 'gb18030', 'big5', 'cp936']
+    fallback_encodings = ['gb2312', 'gbk', 'gb18030', 'big5', 'cp936']
     
     for root, _, files in os.walk(directory):
+        # Join paths by concatenation in the per-file loop
+        root_sep = os.path.join(root, '')
         for filename in files:
             if not filename.lower().endswith('.txt'):
                 continue
 
-            file_path = os.path.join(root, filename)
+            file_path = root_sep + filename
             
             # Read raw content once
             with open(file_path, 'rb') as file:
                 content = file.read()
 
+            # Nothing to do for files that are already UTF-8
+            try:
+                content.decode('utf-8')
+                continue
+            except UnicodeDecodeError:
+                pass
+
             # Try fallback encodings first
             converted = False
             for encoding in fallback_encodings:
@@ -39,7 +46,7 @@ def convert_to_utf8(directory: str):
             # If all fallbacks fail, try with detected encoding
             if not converted:
                 try:
-                    detected_encoding = detect_encoding(file_path)
+                    detected_encoding = detect_encoding(content)
                     text = content.decode(detected_encoding, errors='ignore')
                     with open(file_path, 'w', encoding='utf-8') as file:
                         file.write(text)
@@ -1,40 +1,43 @@
 import os
 import chardet
 
-def detect_encoding(file_path: str) -> str:
-    """Detect the encoding of a file using chardet."""
-    with open(file_path, 'rb') as file:
-        raw_data = file.read()
-        result = chardet.detect(raw_data)
-        return result['encoding']
+def detect_encoding(raw_data: bytes) -> str:
+    """Detect the encoding of already-read file content using chardet."""
+    result = chardet.detect(raw_data)
+    return result['encoding']
 
 def convert_to_utf8(directory: str):
     """Recursively process txt files in the directory to convert them to UTF-8."""
     for root, _, files in os.walk(directory):
+        # Join paths by concatenation in the per-file loop
+        root_sep = os.path.join(root, '')
         for filename in files:
             if not filename.lower().endswith('.txt'):
                 continue
 
-            file_path = os.path.join(root, filename)
-                        # First check if already UTF-8
+            file_path = root_sep + filename
+
+            # Read raw content once and reuse it for every check below
+            with open(file_path, 'rb') as file:
+                raw_data = file.read()
+
+            # First check if already UTF-8
             try:
-                with open(file_path, 'r', encoding='utf-8') as file:
-                    file.read()
-                    print(f"Skipping {file_path} - already UTF-8")
-                    continue
+                raw_data.decode('utf-8')
+                print(f"Skipping {file_path} - already UTF-8")
+                continue
             except UnicodeDecodeError:
                 pass  # Not UTF-8, proceed with conversion
             
             # Detect original encoding
-            original_encoding = detect_encoding(file_path)
+            original_encoding = detect_encoding(raw_data)
             if original_encoding is None:
                 print(f"Warning: Could not detect encoding for {file_path}")
                 continue
                 
             try:
-                # Read content with detected encoding
-                with open(file_path, 'r', encoding=original_encoding) as file:
-                    content = file.read()
+                # Decode with detected encoding, normalizing newlines like a text-mode read
+                content = raw_data.decode(original_encoding).replace('\r\n', '\n').replace('\r', '\n')
                 
                 # Write content in UTF-8
                 with open(file_path, 'w', encoding='utf-8') as file:
@@ -45,7 +48,7 @@ def convert_to_utf8(directory: str):
                 # Rename if contains spaces
                 if ' ' in filename:
                     new_filename = filename.replace(' ', '_')
-                    new_file_path = os.path.join(root, new_filename)
+                    new_file_path = root_sep + new_filename
                     os.rename(file_path, new_file_path)
                     print(f"Renamed: {file_path} -> {new_file_path}")
                     
@@ -1,35 +1,143 @@
+import functools
+import json
 import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import re
 import yaml
+try:
+    from yaml import CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeDumper
+try:
+    import orjson
+except ImportError:
+    orjson = None
 from .ignore import load_ignore_patterns, is_ignored
+from .utils import load_yaml, cache_file_path
 from datetime import datetime  # Add at top with other imports
 
-def load_yaml(file_path):
-    with open(file_path, 'r', encoding='utf-8') as f:
-        try:
-            return yaml.safe_load(f)
-        except yaml.YAMLError as e:
-            print(f"Error parsing {file_path}: {e}")
-            return None
+# Characters json.dumps leaves unescaped that YAML reads as line breaks or rejects
+YAML_UNSAFE_CHARACTERS = re.compile('[\x7f-\x9f\u2028\u2029\ufeff\ufffe\uffff]')
+
+def yaml_scalar(value):
+    """
+    Render a str, int, bool or None as a YAML flow scalar. Strings become
+    JSON-style double-quoted scalars, which YAML reads back unchanged.
+    """
+    if value is None:
+        return 'null'
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, str):
+        quoted = json.dumps(value, ensure_ascii=False)
+        return YAML_UNSAFE_CHARACTERS.sub(lambda m: f'\\u{ord(m.group()):04x}', quoted)
+    raise TypeError(f"Unsupported YAML scalar: {type(value).__name__}")
+
+# Metadata field names that can be written unquoted: identifiers other than
+# the words YAML would read as booleans or null
+PLAIN_KEY_PATTERN = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+YAML_RESERVED_WORDS = frozenset({'yes', 'no', 'true', 'false', 'on', 'off', 'null', 'y', 'n'})
+
+def yaml_key(key):
+    if isinstance(key, str) and PLAIN_KEY_PATTERN.fullmatch(key) and key.lower() not in YAML_RESERVED_WORDS:
+        return key
+    return yaml_scalar(key)
+
+def dump_flat_index(index):
+    """
+    Emit the search index (a dict of flat metadata dicts) as YAML text
+    without going through PyYAML's representer and emitter.
+    Raises TypeError for values it does not handle, e.g. nested dicts.
+    """
+    lines = []
+    for rel_path, metadata in index.items():
+        if not metadata:
+            lines.append(f"{yaml_scalar(rel_path)}: {{}}\n")
+            continue
+        lines.append(f"{yaml_scalar(rel_path)}:\n")
+        for key, value in metadata.items():
+            if isinstance(value, list):
+                value = '[' + ', '.join(yaml_scalar(item) for item in value) + ']'
+            else:
+                value = yaml_scalar(value)
+            lines.append(f"  {yaml_key(key)}: {value}\n")
+    return ''.join(lines)
+
+def write_if_changed(file_path, data):
+    """
+    Write bytes to file_path unless it already holds exactly them, so an
+    unchanged output keeps its mtime. Returns True if the file was written.
+    """
+    try:
+        if os.path.getsize(file_path) == len(data):
+            with open(file_path, 'rb') as f:
+                if f.read() == data:
+                    return False
+    except OSError:
+        pass
+    with open(file_path, 'wb') as f:
+        f.write(data)
+    return True
+
+def save_search_index(file_path, index):
+    """
+    Write the search index as YAML, using dump_flat_index when every value
+    is a plain scalar or list of scalars, and PyYAML otherwise.
+    Returns True if the file changed.
+    """
+    try:
+        text = dump_flat_index(index)
+    except TypeError:
+        text = yaml.dump(index, Dumper=SafeDumper, allow_unicode=True, sort_keys=False)
+    return write_if_changed(file_path, text.encode('utf-8'))
 
-def save_yaml(file_path, data):
-    with open(file_path, 'w', encoding='utf-8') as f:
-        yaml.dump(data, f, allow_unicode=True, sort_keys=False)
+def save_json(file_path, data):
+    """
+    Write data as indented JSON, via orjson when it is installed.
+    Returns True if the file changed.
+    """
+    if orjson is not None:
+        encoded = orjson.dumps(data, option=orjson.OPT_INDENT_2, default=str)
+    else:
+        encoded = json.dumps(data, ensure_ascii=False, indent=2, default=str).encode('utf-8')
+    return write_if_changed(file_path, encoded)
+
+# Formats accepted by normalize_date, most common first. strptime requires a
+# full match, so at most one of them can succeed for a given input.
+DATE_FORMATS = [
+    '%Y-%m-%d',
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m',
+    '%Y'
+]
+
+# Zero-padded YYYY, YYYY-MM and YYYY-MM-DD: the common cases, which
+# normalize_date handles without going through strptime
+PADDED_DATE_PATTERN = re.compile(r'([1-9]\d{3})(?:-(0[1-9]|1[0-2])(?:-(\d{2}))?)?')
 
-# Add this function before extract_metadata_from_markdown
+# Pure function with highly repetitive inputs, so cache the strptime work
+@functools.lru_cache(maxsize=4096)
 def normalize_date(date_str):
     if date_str is None or date_str == '未知' or not date_str:
         return '未知'
+
+    match = PADDED_DATE_PATTERN.fullmatch(str(date_str))
+    if match:
+        year, month, day = match.groups()
+        if month is None:
+            return f"{date_str}-01-01"
+        if day is None:
+            return f"{date_str}-01"
+        try:
+            datetime(int(year), int(month), int(day))
+            return str(date_str)
+        except ValueError:
+            pass  # e.g. February 30th; let strptime reject it below
     
     # Try parsing different formats
-    date_formats = [
-        '%Y-%m-%d %H:%M:%S',
-        '%Y-%m-%d',
-        '%Y-%m',
-        '%Y'
-    ]
-    
-    for fmt in date_formats:
+    for fmt in DATE_FORMATS:
         try:
             date_obj = datetime.strptime(str(date_str), fmt)
             if fmt == '%Y':
@@ -43,30 +151,40 @@ def normalize_date(date_str):
     print(f"Warning: Invalid date format: {date_str}")
     return '未知'
 
+# Page patterns, compiled once for the whole walk. The abstract and table are
+# searched separately: each starts with a literal, which lets re jump between
+# candidate positions, while one alternation of both would try every position.
+ABSTRACT_PATTERN = re.compile(r'<!-- tcd_abstract -->\n(.*?)\n<!-- tcd_abstract_end -->', re.DOTALL)
+TABLE_PATTERN = re.compile(r'\| Attribute\s*\|\s*Value\s*\|\s*\n\|[-\s|]+\n((?:\|.*\|\s*\n)+)')
+TABLE_ROW_PATTERN = re.compile(r'\|\s*([^|]+?)\s*\|\s*([^|]+?)\s*\|')
+# Matches markdown links in format [text](url)
+MARKDOWN_LINK_PATTERN = re.compile(r'\[(.*?)\]\((.*?)\)')
+
+# Attribute table rows copied into the index (matched on the lowercased key)
+METADATA_KEYS = frozenset({'region', 'date', 'author', 'tags', 'original link', 'archived date'})
+
 def extract_metadata_from_markdown(content):
     metadata = {}
     
     # Extract abstract
-    abstract_match = re.search(
-        r'<!-- tcd_abstract -->\n(.*?)\n<!-- tcd_abstract_end -->',
-        content, re.DOTALL)
+    abstract_match = ABSTRACT_PATTERN.search(content)
     if abstract_match:
         metadata['description'] = abstract_match.group(1).strip()
 
     # Extract table metadata
-    table_match = re.search(r'\| Attribute\s*\|\s*Value\s*\|\s*\n\|[-\s|]+\n((?:\|.*\|\s*\n)+)', content)    
+    table_match = TABLE_PATTERN.search(content)
     if table_match:
         table_content = table_match.group(1)
-        rows = re.findall(r'\|\s*([^|]+?)\s*\|\s*([^|]+?)\s*\|', table_content)
+        rows = TABLE_ROW_PATTERN.findall(table_content)
         for key, value in rows:
             key = key.strip().lower()
             value = value.strip()
-            if key in ['region', 'date', 'author', 'tags', 'original link', 'archived date']:
+            if key in METADATA_KEYS:
                 if key == 'tags':
                     metadata['tags'] = [tag.strip() for tag in value.split(',')]
                 elif key == 'original link':
                     metadata['link'] = extract_markdown_link(value)
-                elif key in ['date', 'archived date']:
+                elif key in ('date', 'archived date'):
                     metadata[key] = normalize_date(value)
                 else:
                     metadata[key] = value
@@ -75,41 +193,164 @@ def extract_metadata_from_markdown(content):
     return metadata
 
 def extract_markdown_link(markdown_text):
-    # Matches markdown links in format [text](url)
-    pattern = r'\[(.*?)\]\((.*?)\)'
-    match = re.search(pattern, markdown_text)
+    match = MARKDOWN_LINK_PATTERN.search(markdown_text)
     if match:
         return match.group(2)  # group 2 contains the URL
     return None
 
+# Bytes that count as text when sniffing for binary content. Kept as an
+# immutable bytes object so translate() can use it as its deletion table
+# directly, leaving only the non-text bytes behind.
+TEXT_CHARACTERS = bytes(sorted({7,8,9,10,12,13,27})) + bytes(range(0x20, 0x100))
+
+def is_binary_chunk(chunk):
+    """
+    Check if a chunk of bytes (the head of a file) looks binary.
+    """
+    if not chunk:
+        return True  # Empty files carry no text to index
+    if b'\0' in chunk:
+        return True
+    nontext = chunk.translate(None, TEXT_CHARACTERS)
+    return len(nontext) / len(chunk) > 0.30
+
 def is_binary_file(file_path):
     """
     Check if a file is binary.
     """
     try:
-        with open(file_path, 'rb') as f:
-            chunk = f.read(1024)
-            if b'\0' in chunk:
-                return True
-            else:
-                text_characters = bytearray({7,8,9,10,12,13,27}) + bytearray(range(0x20, 0x100))
-                nontext = chunk.translate(None, text_characters)
-                if len(nontext) / len(chunk) > 0.30:
-                    return True
-        return False
-    except:
+        # Raw descriptor read: no buffered file object for a 1 KiB probe
+        fd = os.open(file_path, os.O_RDONLY)
+        try:
+            chunk = os.read(fd, 1024)
+        finally:
+            os.close(fd)
+    except OSError:
         return True  # Assume binary if unreadable
+    return is_binary_chunk(chunk)
 
-def update_files(root_dir, output_path):
+def decode_text(raw):
+    """Decode raw page bytes the same way a text-mode open() would."""
+    return raw.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+
+# Page extensions that are never text, so are not even opened
+BINARY_EXTENSIONS = frozenset({'.pdf', '.epub', '.mobi', '.zip', '.rar', '.7z',
+                               '.jpg', '.jpeg', '.png', '.gif', '.webp', '.mp3', '.mp4'})
+
+# Abstract and attribute table sit at the top of a page, so usually only
+# this many bytes need to be read
+PAGE_HEAD_SIZE = 16384
+
+def decode_head(raw):
+    """Decode the head of a page, dropping a multi-byte character cut off at the end."""
+    try:
+        return decode_text(raw)
+    except UnicodeDecodeError as e:
+        if e.start < len(raw) - 3:
+            raise
+        return decode_text(raw[:e.start])
+
+def head_has_metadata(head):
+    """
+    Check that the abstract and the whole attribute table lie inside head, in
+    which case searching the full page would find exactly the same blocks.
+    """
+    if not ABSTRACT_PATTERN.search(head):
+        return False
+    table_match = TABLE_PATTERN.search(head)
+    # The table regex stops at the first line that is not a row; that line
+    # must end inside head too, or the table could continue past it
+    return bool(table_match) and '\n' in head[table_match.end():]
+
+def read_page_metadata(page_path):
+    """
+    Read a page (usually just its head) and extract its metadata.
+    Returns None for binary or unreadable pages; raises if a text page cannot be processed.
+    When the head holds all the metadata the rest of the page is not read, so
+    invalid UTF-8 after the head does not make the page fail.
+    """
+    if os.path.splitext(page_path)[1].lower() in BINARY_EXTENSIONS:
+        return None
+    head = None
+    try:
+        with open(page_path, 'rb') as f:
+            raw = f.read(PAGE_HEAD_SIZE)
+            if is_binary_chunk(raw[:1024]):
+                return None
+            if len(raw) == PAGE_HEAD_SIZE:
+                head = decode_head(raw)
+                if not head_has_metadata(head):
+                    head = None
+                    raw += f.read()
+    except OSError:
+        return None  # Assume binary if unreadable
+    # Extraction errors are raised and reported, whichever part of the page is used
+    if head is not None:
+        return extract_metadata_from_markdown(head)
+    return extract_metadata_from_markdown(decode_text(raw))
+
+def extract_page_job(page_path):
+    """
+    Process-pool worker for update_files: returns (content metadata, error message).
+    """
+    try:
+        return read_page_metadata(page_path), None
+    except Exception as e:
+        return None, str(e)
+
+# Below this many pages to extract, starting worker processes costs more than it
+# saves; smaller batches use threads, which still overlap the page reads
+PARALLEL_THRESHOLD = 64
+
+# Bump when read_page_metadata output changes so stale caches are discarded
+PAGE_CACHE_VERSION = 2
+
+def load_page_cache(cache_path):
+    """
+    Load the page metadata cache: rel_path -> ((mtime_ns, size), content metadata).
+    """
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        if cache.get('version') == PAGE_CACHE_VERSION:
+            return {rel_path: ((mtime_ns, size), metadata)
+                    for rel_path, (mtime_ns, size, metadata) in cache['pages'].items()}
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        pass
+    return {}
+
+def save_page_cache(cache_path, pages):
+    # Stored as JSON, which unlike pickle cannot run code when it is loaded
+    pages = {rel_path: [stamp[0], stamp[1], metadata]
+             for rel_path, (stamp, metadata) in pages.items()}
+    try:
+        os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+        tmp_path = cache_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': PAGE_CACHE_VERSION, 'pages': pages}, f, ensure_ascii=False)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"Error saving page cache {cache_path}: {e}")
+
+def update_files(root_dir, output_path, cache_path=None):
     ignore_regexes = load_ignore_patterns()
     search_index = {}
     files_processed = 0
 
+    # Pages whose mtime and size are unchanged since the last run reuse their cached metadata
+    if cache_path is None:
+        cache_path = cache_file_path('search_index.cache.json', root_dir)
+    page_cache = load_page_cache(cache_path)
+    new_page_cache = {}
+    pending = []
+
     for root, dirs, files in os.walk(root_dir):
-        dirs[:] = [d for d in dirs if not is_ignored(os.path.join(root, d), ignore_regexes)]
+        # Join paths by concatenation in the per-entry loops below
+        root_sep = os.path.join(root, '')
+        dirs[:] = [d for d in dirs if not is_ignored(root_sep + d, ignore_regexes)]
         
-        if 'config.yml' in files and not is_ignored(os.path.join(root, 'config.yml'), ignore_regexes):
-            config_path = os.path.join(root, 'config.yml')
+        config_path = root_sep + 'config.yml'
+        if 'config.yml' in files and not is_ignored(config_path, ignore_regexes):
             config_data = load_yaml(config_path)
 
             if not config_data or 'files' not in config_data:
@@ -119,52 +360,86 @@ def update_files(root_dir, output_path):
                 page = file_entry.get('page')
                 if not page:
                     continue
-                page_path = os.path.join(root, page)
+                page_path = root_sep + page
                 rel_path = os.path.relpath(page_path, root_dir)
 
                 if is_ignored(page_path, ignore_regexes):
                     continue
 
-                if os.path.exists(page_path):
-                    files_processed += 1
-                    
-                    # Get basic metadata from file_entry
-                    metadata = {
-                        'type': file_entry.get('type', 'document'),
-                        'format': file_entry.get('format', 'Unknown'),
-                        'size': file_entry.get('size', 0),
-                        'md5': file_entry.get('md5', ''),
-                        'filename': file_entry.get('filename', ''),
-                        'link': '',
-                        'description': os.path.join(root, file_entry.get('name')),
-                        'archived date': '未知',
-                        'link': '未知',
-                        'author': '未知',
-                        'date': '未知',
-                        'region': '未知',
-                        'tags': ['binary'],
-                        'visitor': 0,
-                        'download': 0,
-                    }
-
-                    if is_binary_file(page_path):
-                        search_index[rel_path] = metadata
-                    else:
-                        try:
-                            with open(page_path, 'r', encoding='utf-8') as f:
-                                content = f.read()
-                                content_metadata = extract_metadata_from_markdown(content)
-                                metadata.update(content_metadata)
-                                search_index[rel_path] = metadata
-                        except Exception as e:
-                            print(f"Error processing {page_path}: {e}")
-                else:
+                try:
+                    st = os.stat(page_path)
+                except OSError:
                     print(f"Page file not found: {page_path}")
+                    continue
 
-    # Save search index
-    save_yaml(output_path, search_index)
-    print(f"Generated search index at {output_path}")
+                files_processed += 1
+                
+                # Get basic metadata from file_entry
+                metadata = {
+                    'type': file_entry.get('type', 'document'),
+                    'format': file_entry.get('format', 'Unknown'),
+                    'size': file_entry.get('size', 0),
+                    'md5': file_entry.get('md5', ''),
+                    'filename': file_entry.get('filename', ''),
+                    'link': '',
+                    'description': os.path.join(root, file_entry.get('name')),
+                    'archived date': '未知',
+                    'link': '未知',
+                    'author': '未知',
+                    'date': '未知',
+                    'region': '未知',
+                    'tags': ['binary'],
+                    'visitor': 0,
+                    'download': 0,
+                }
+
+                # Insert now to keep walk order; new or changed pages are filled in below
+                search_index[rel_path] = metadata
+                stamp = (st.st_mtime_ns, st.st_size)
+                cached = page_cache.get(rel_path)
+                if cached is not None and cached[0] == stamp:
+                    new_page_cache[rel_path] = cached
+                    if cached[1] is not None:
+                        metadata.update(cached[1])
+                else:
+                    pending.append((rel_path, page_path, metadata, stamp))
+
+    # Extract metadata for new or changed pages: processes for large batches, threads otherwise
+    page_paths = [page_path for _, page_path, _, _ in pending]
+    if len(page_paths) >= PARALLEL_THRESHOLD:
+        workers = os.cpu_count() or 1
+        chunksize = min(64, max(1, len(page_paths) // (workers * 4)))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(extract_page_job, page_paths, chunksize=chunksize))
+    elif len(page_paths) > 1:
+        with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as executor:
+            results = list(executor.map(extract_page_job, page_paths))
+    else:
+        results = [extract_page_job(page_path) for page_path in page_paths]
+
+    for (rel_path, page_path, metadata, stamp), (content_metadata, error) in zip(pending, results):
+        if error is not None:
+            print(f"Error processing {page_path}: {error}")
+            search_index.pop(rel_path, None)
+            continue
+        new_page_cache[rel_path] = (stamp, content_metadata)
+        if content_metadata is not None:
+            metadata.update(content_metadata)
+
+    # Save search index; files whose content is unchanged are left untouched
+    if save_search_index(output_path, search_index):
+        print(f"Generated search index at {output_path}")
+    else:
+        print(f"Search index unchanged at {output_path}")
+    # JSON copy of the same index; much faster to dump and load than YAML
+    json_path = os.path.splitext(output_path)[0] + '.json'
+    if save_json(json_path, search_index):
+        print(f"Generated search index at {json_path}")
+    else:
+        print(f"Search index unchanged at {json_path}")
     print(f"Total files processed: {files_processed}")  # Print total
+    if new_page_cache != page_cache:
+        save_page_cache(cache_path, new_page_cache)
 
 def gen_search_index_main(root_directory="."):
     """Generate search index for the site content"""
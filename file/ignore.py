@@ -1,8 +1,15 @@
+import atexit
+import functools
 import os
 import re
 import subprocess
+import threading
 
 import yaml
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
 
 def load_ignore_patterns():
     """
@@ -12,11 +19,147 @@ def load_ignore_patterns():
     digital_yml_path = 'digital.yml'
     if os.path.exists(digital_yml_path):
         with open(digital_yml_path, 'r', encoding='utf-8') as f:
-            digital_config = yaml.safe_load(f)
+            digital_config = yaml.load(f, Loader=SafeLoader)
             ignore_patterns = digital_config.get('ignore', [])
             ignore_regexes = [re.compile(pattern) for pattern in ignore_patterns]
+    # Refresh the git snapshot too, so each run sees the current .gitignore rules
+    global _git_ignored
+    _git_ignored = load_git_ignored_paths()
+    in_git_ignored.cache_clear()
     return ignore_regexes
 
+def load_git_ignored_paths():
+    """
+    Ask git once for every ignored, untracked path under the current directory.
+    Fully ignored directories are listed once rather than file by file.
+    Returns an empty set when git is unavailable or this is not a work tree.
+    """
+    try:
+        result = subprocess.run(
+            ['git', 'ls-files', '--others', '--ignored', '--exclude-standard', '--directory', '-z'],
+            capture_output=True
+        )
+    except (OSError, subprocess.SubprocessError):
+        return set()
+    if result.returncode != 0:
+        return set()
+    return {os.path.normpath(path) for path in os.fsdecode(result.stdout).split('\0') if path}
+
+# Git-ignored paths relative to the working directory, taken by load_ignore_patterns
+_git_ignored = None
+
+@functools.lru_cache(maxsize=8192)
+def in_git_ignored(rel_path: str) -> bool:
+    """
+    Check rel_path and its parent directories against the git-ignored snapshot.
+    Cached per path, so each directory is resolved once however many files
+    below it are checked.
+    """
+    global _git_ignored
+    if not rel_path:
+        return False
+    if _git_ignored is None:
+        _git_ignored = load_git_ignored_paths()
+    if rel_path in _git_ignored:
+        return True
+    return in_git_ignored(os.path.dirname(rel_path))
+
+def combine_ignore_regexes(ignore_regexes):
+    """
+    Fuse ignore regexes into a single alternation so a path is scanned once.
+    Returns None when there is nothing to combine or the patterns cannot be
+    joined (e.g. one uses inline global flags).
+    """
+    if not ignore_regexes:
+        return None
+    try:
+        return re.compile('|'.join(f'(?:{regex.pattern})' for regex in ignore_regexes))
+    except re.error:
+        return None
+
+# (ignore list, combined alternation) most recently passed to is_ignored; kept
+# as one tuple so threads never see a list paired with another's regex
+_combined = (None, None)
+
+def _get_combined_regex(ignore_regexes):
+    global _combined
+    source, combined_regex = _combined
+    if ignore_regexes is not source:
+        combined_regex = combine_ignore_regexes(ignore_regexes)
+        _combined = (ignore_regexes, combined_regex)
+    return combined_regex
+
+# Long-running 'git check-ignore --stdin' process shared by all is_ignored calls
+_check_ignore_proc = None
+_check_ignore_cwd = None
+_check_ignore_buffer = b''
+_check_ignore_lock = threading.Lock()
+
+def _stop_check_ignore():
+    global _check_ignore_proc, _check_ignore_buffer
+    proc = _check_ignore_proc
+    _check_ignore_proc = None
+    _check_ignore_buffer = b''
+    if proc:
+        try:
+            proc.stdin.close()
+            proc.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            proc.kill()
+
+def _read_check_ignore_field(proc):
+    global _check_ignore_buffer
+    while b'\0' not in _check_ignore_buffer:
+        chunk = os.read(proc.stdout.fileno(), 65536)
+        if not chunk:
+            raise EOFError('git check-ignore exited')
+        _check_ignore_buffer += chunk
+    field, _, _check_ignore_buffer = _check_ignore_buffer.partition(b'\0')
+    return field
+
+def git_check_ignore(path: str) -> bool:
+    """
+    Ask the shared git check-ignore process whether path is git-ignored.
+    The process is started on first use and restarted if the working
+    directory changes, since it resolves paths relative to where it started.
+    """
+    global _check_ignore_proc, _check_ignore_cwd
+    with _check_ignore_lock:
+        cwd = os.getcwd()
+        if _check_ignore_cwd != cwd:
+            _stop_check_ignore()
+            _check_ignore_cwd = cwd
+            try:
+                # GIT_FLUSH makes git answer each path immediately instead of buffering
+                _check_ignore_proc = subprocess.Popen(
+                    ['git', 'check-ignore', '--stdin', '-z', '-v', '-n'],
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL,
+                    env={**os.environ, 'GIT_FLUSH': '1'}
+                )
+            except OSError:
+                # git is not installed
+                _check_ignore_proc = False
+        if not _check_ignore_proc:
+            return False
+
+        try:
+            _check_ignore_proc.stdin.write(os.fsencode(path) + b'\0')
+            _check_ignore_proc.stdin.flush()
+            # With -v -n every path gets source, line number, pattern and path;
+            # the first three are empty when no pattern matched
+            source, _, pattern, _ = [_read_check_ignore_field(_check_ignore_proc) for _ in range(4)]
+        except (OSError, EOFError):
+            # Not inside a git work tree; stop asking until the directory changes
+            _stop_check_ignore()
+            _check_ignore_proc = False
+            return False
+        # A matching negated pattern (!pattern) means the path is not ignored
+        return bool(source) and not pattern.startswith(b'!')
+
+atexit.register(_stop_check_ignore)
+
 def is_ignored(path: str, ignore_regexes) -> bool:
     """
     Check if a path is ignored by git or matches any ignore pattern.
@@ -26,19 +169,20 @@ def is_ignored(path: str, ignore_regexes) -> bool:
 
     normalized_path = os.path.normpath(path)
 
-    # Check if any ignore regex matches the path
-    for regex in ignore_regexes:
-        if regex.search(normalized_path):
-            print(f"Ignore: {path} (matched pattern: {regex.pattern})")
-            return True
+    # Check the ignore regexes with one search, then find the culprit for the log
+    combined_regex = _get_combined_regex(ignore_regexes)
+    if combined_regex is None or combined_regex.search(normalized_path):
+        for regex in ignore_regexes:
+            if regex.search(normalized_path):
+                print(f"Ignore: {path} (matched pattern: {regex.pattern})")
+                return True
 
-    # Check if path is git-ignored
-    try:
-        result = subprocess.run(
-            ['git', 'check-ignore', '-q', path],
-            capture_output=True,
-            text=True
-        )
-        return result.returncode == 0
-    except subprocess.SubprocessError:
+    # Check if path or one of its parent directories is git-ignored
+    rel_path = os.path.relpath(normalized_path)
+    if rel_path == os.curdir:
         return False
+    if rel_path != os.pardir and not rel_path.startswith(os.pardir + os.sep):
+        return in_git_ignored(rel_path)
+
+    # Outside the snapshot, ask git directly
+    return git_check_ignore(path)
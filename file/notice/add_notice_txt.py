@@ -1,5 +1,9 @@
 import os
 import yaml
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
 
 def load_yaml(file_path):
     """
@@ -7,7 +11,7 @@ def load_yaml(file_path):
     """
     with open(file_path, 'r', encoding='utf-8') as f:
         try:
-            return yaml.safe_load(f)
+            return yaml.load(f, Loader=SafeLoader)
         except yaml.YAMLError as e:
             print(f"Error parsing {file_path}: {e}")
             return None
@@ -24,11 +28,19 @@ def add_notice_to_txt_files_from_yaml(root_dir, notice_template_path):
         print(f"Error reading notice template: {e}")
         return
 
+    # The notice is always prepended, so a file that already has it starts
+    # with these bytes; checking the head avoids reading the whole file.
+    notice_text = notice_content.strip()
+    notice_prefix = notice_text.encode('utf-8')
+
     files_modified = 0
 
     for root, dirs, files in os.walk(root_dir):
-        if 'config.yml' in files:
-            config_path = os.path.join(root, 'config.yml')
+        # Only parse config.yml where there is a .txt file it could refer to
+        if 'config.yml' in files and any(f.endswith('.txt') for f in files):
+            # Join paths by concatenation in the per-file loop below
+            root_sep = os.path.join(root, '')
+            config_path = root_sep + 'config.yml'
             config_data = load_yaml(config_path)
             
             if not config_data or 'files' not in config_data:
@@ -37,19 +49,22 @@ def add_notice_to_txt_files_from_yaml(root_dir, notice_template_path):
             for file_entry in config_data['files']:
                 txt_file = file_entry.get('filename')
                 if txt_file and txt_file.endswith('.txt'):
-                    txt_file_path = os.path.join(root, txt_file)
+                    txt_file_path = root_sep + txt_file
                     
                     if os.path.exists(txt_file_path):
                         try:
                             # Check if the notice is already present
+                            with open(txt_file_path, 'rb') as f:
+                                if f.read(len(notice_prefix)) == notice_prefix:
+                                    continue  # Skip if notice already exists
                             with open(txt_file_path, 'r', encoding='utf-8') as f:
                                 content = f.read()
-                            if notice_content.strip() in content:
+                            if notice_text in content:
                                 continue  # Skip if notice already exists
                             
                             # Add the notice at the top of the file
                             with open(txt_file_path, 'w', encoding='utf-8') as f:
-                                f.write(notice_content.strip() + "\n\n" + content)
+                                f.write(notice_text + "\n\n" + content)
                             files_modified += 1
                             print(f"Notice added to: {txt_file_path}")
                         except Exception as e:
@@ -1,5 +1,14 @@
 import os
 import json
+import sys
+
+# Add parent directory to path for imports
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(os.path.dirname(os.path.dirname(current_dir)))
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+from scripts.file.utils import write_json
 
 def read_template(template_path):
     """Read the template file and get the English and Chinese notices."""
@@ -12,11 +21,6 @@ def read_json(file_path):
     with open(file_path, 'r', encoding='utf-8') as file:
         return json.load(file)
 
-def write_json(file_path, data):
-    """Write data to JSON file."""
-    with open(file_path, 'w', encoding='utf-8') as file:
-        json.dump(data, file, indent=2, ensure_ascii=False)
-
 def add_action_notice(docs_dir, config_path, template_path):
     """Add action notice to markdown files and update config."""
     en_notice, zh_notice = read_template(template_path)
@@ -38,19 +42,10 @@ def add_action_notice(docs_dir, config_path, template_path):
                 if passages[file_path].get("endactionnotice"):
                     continue
 
-                # Read the file content
-                with open(full_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-
-                # Add appropriate notice
-                if file.endswith('.zh.md'):
-                    new_content = content + '\n\n' + zh_notice + '\n'
-                else:
-                    new_content = content + '\n\n' + en_notice + '\n'
-
-                # Write the modified content
-                with open(full_path, 'w', encoding='utf-8') as f:
-                    f.write(new_content)
+                # Append the appropriate notice; the existing content is left untouched
+                notice = zh_notice if file.endswith('.zh.md') else en_notice
+                with open(full_path, 'a', encoding='utf-8') as f:
+                    f.write('\n\n' + notice + '\n')
 
                 # Update config
                 passages[file_path]["endactionnotice"] = True
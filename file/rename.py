@@ -1,18 +1,39 @@
+import json
 import os
 import re
-import yaml
 from typing import Optional
+from .utils import load_yaml, cache_file_path
 
-def rename_files_in_directory(directory: str):
-    """Recursively rename files in the directory to remove spaces and special characters."""
-    for root, _, files in os.walk(directory):
-        # Skip .github directory
-        if root.startswith('./.github') or root.startswith('.github'):
+# Characters replaced with underscores in file names
+SPECIAL_CHARS_PATTERN = re.compile(r'[ \[\]\(\)#]')
+# Anything rename_files_in_directory would change; most names match none of it
+NEEDS_RENAME_PATTERN = re.compile(r'[ \[\]\(\)#]|soushu2023\.com@|搜书吧')
+# Download link block in a page, either as a Markdown or an HTML link
+DOWNLOAD_LINK_PATTERN = re.compile(
+    r'<!-- tcd_download_link -->\s*.*(?:\[(.*?)\]\((.*?)\)|<a href="(.*?)".*?>(.*?)</a>)\s*<!-- tcd_download_link_end -->',
+    re.DOTALL
+)
+DOWNLOAD_BLOCK_PATTERN = re.compile(r'<!-- tcd_download_link -->.*?<!-- tcd_download_link_end -->', re.DOTALL)
+
+def rename_files_in_directory(directory: str) -> list:
+    """
+    Recursively rename files in the directory to remove spaces and special characters.
+    Returns the config.yml paths seen on the way, so the link update need not walk again.
+    """
+    config_paths = []
+    for root, dirs, files in os.walk(directory):
+        # Skip .github directory, without descending into it
+        if root.startswith(('./.github', '.github')):
             continue
+        dirs[:] = [d for d in dirs if not os.path.join(root, d).startswith(('./.github', '.github'))]
+        if 'config.yml' in files:
+            config_paths.append(os.path.join(root, 'config.yml'))
             
         for filename in files:
+            if not NEEDS_RENAME_PATTERN.search(filename):
+                continue
             # Generate new filename by replacing spaces and special characters with underscores
-            new_filename = re.sub(r'[ \[\]\(\)#]', '_', filename)
+            new_filename = SPECIAL_CHARS_PATTERN.sub('_', filename)
             new_filename = new_filename.replace('soushu2023.com@', '')
             new_filename = new_filename.replace('搜书吧', '')
             if new_filename != filename:
@@ -22,79 +43,127 @@ def rename_files_in_directory(directory: str):
                 # Rename the file
                 os.rename(old_file_path, new_file_path)
                 print(f"Renamed: {old_file_path} -> {new_file_path}")
+    return config_paths
+
+# Marks the download link block; pages without it are never rewritten
+DOWNLOAD_LINK_START = '<!-- tcd_download_link -->'
+
+# Bump when the generated link block changes so every page is rewritten
+LINK_CACHE_VERSION = 1
+
+def load_link_cache(cache_path: str) -> dict:
+    """
+    Load the download link cache: page rel_path -> [mtime_ns, size, filename].
+    """
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        if cache.get('version') == LINK_CACHE_VERSION:
+            return cache['pages']
+    except (OSError, ValueError, KeyError, AttributeError):
+        pass
+    return {}
+
+def save_link_cache(cache_path: str, pages: dict):
+    try:
+        os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+        tmp_path = cache_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': LINK_CACHE_VERSION, 'pages': pages}, f)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"Error saving link cache {cache_path}: {e}")
+
+def update_download_links(directory: str, cache_path: Optional[str] = None,
+                          config_paths: Optional[list] = None):
+    """
+    Update download links in markdown files based on config.yml.
+    config_paths, when given, replaces walking the directory for config files.
+    """
+    # Pages already checked for the same filename and not modified since are skipped
+    if cache_path is None:
+        cache_path = cache_file_path('download_links.cache.json', directory)
+    link_cache = load_link_cache(cache_path)
+    new_link_cache = {}
 
-def update_download_links(directory: str):
-    """Update download links in markdown files based on config.yml."""
     # Keep track of processed config files to avoid duplicates
     processed_configs = set()
     
-    for root, _, files in os.walk(directory):
-        if 'config.yml' in files:
-            config_path = os.path.join(root, 'config.yml')
+    if config_paths is None:
+        config_paths = [os.path.join(root, 'config.yml')
+                        for root, _, files in os.walk(directory) if 'config.yml' in files]
+
+    for config_path in config_paths:
+        root = os.path.dirname(config_path)
+        
+        # Skip if we've already processed this config
+        if config_path in processed_configs:
+            continue
             
-            # Skip if we've already processed this config
-            if config_path in processed_configs:
+        processed_configs.add(config_path)
+        print(f"Processing config.yml at: {config_path}")
+        
+        try:
+            config = load_yaml(config_path)
+
+            if not config or 'files' not in config:
+                print(f"No files section in config at {config_path}")
                 continue
                 
-            processed_configs.add(config_path)
-            print(f"Processing config.yml at: {config_path}")
+            print(f"Found {len(config['files'])} files in config")
             
-            try:
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    config = yaml.safe_load(f)
-                    
-                if not config or 'files' not in config:
-                    print(f"No files section in config at {config_path}")
-                    continue
+            # Create a mapping of page files to their corresponding filenames
+            page_to_filename = {}
+            for file_entry in config['files']:
+                if 'page' in file_entry and 'filename' in file_entry:
+                    page_path = os.path.join(root, file_entry['page'])
+                    page_to_filename[page_path] = file_entry['filename']
+            
+            # Update links in all markdown files found in config
+            for page_path, new_filename in page_to_filename.items():
+                try:
+                    rel_path = os.path.relpath(page_path, directory)
+                    st = os.stat(page_path)
+                    entry = [st.st_mtime_ns, st.st_size, new_filename]
+                    if link_cache.get(rel_path) == entry:
+                        new_link_cache[rel_path] = entry
+                        continue
+
+                    with open(page_path, 'r', encoding='utf-8') as file:
+                        content = file.read()
+
+                    # Extract the old link pattern - support both Markdown and HTML links
+                    match = DOWNLOAD_LINK_PATTERN.search(content) if DOWNLOAD_LINK_START in content else None
                     
-                print(f"Found {len(config['files'])} files in config")
-                
-                # Create a mapping of page files to their corresponding filenames
-                page_to_filename = {}
-                for file_entry in config['files']:
-                    if 'page' in file_entry and 'filename' in file_entry:
-                        page_path = os.path.join(root, file_entry['page'])
-                        page_to_filename[page_path] = file_entry['filename']
-                
-                # Update links in all markdown files found in config
-                for page_path, new_filename in page_to_filename.items():
-                    if os.path.exists(page_path):
-                        try:
-                            with open(page_path, 'r', encoding='utf-8') as file:
-                                content = file.read()
-
-                            # Extract the old link pattern - support both Markdown and HTML links
-                            match = re.search(
-                                r'<!-- tcd_download_link -->\s*.*(?:\[(.*?)\]\((.*?)\)|<a href="(.*?)".*?>(.*?)</a>)\s*<!-- tcd_download_link_end -->',
-                                content,
-                                flags=re.DOTALL
-                            )
-                            
-                            if match:
-                                # Replace with download link and online reading link for txt files
-                                download_link = f'下载: <a href="../{new_filename}" download>{new_filename}</a>'
-                                online_read_link = ''
-                                if new_filename.lower().endswith('.txt'):
-                                    online_read_link = f'\n<a href="../{new_filename}" download onclick="this.href=\'https://app.webnovel.win/?add=\'+encodeURIComponent(this.getAttribute(\'href\'))">在线阅读 {new_filename}</a>'
-                                
-                                updated_content = re.sub(
-                                    r'<!-- tcd_download_link -->.*?<!-- tcd_download_link_end -->',
-                                    f'<!-- tcd_download_link -->\n{download_link}\n\n{online_read_link}\n<!-- tcd_download_link_end -->',
-                                    content,
-                                    flags=re.DOTALL
-                                )
-
-                                if content != updated_content:
-                                    with open(page_path, 'w', encoding='utf-8') as file:
-                                        file.write(updated_content)
-                                    print(f"Updated links in: {page_path}")
-                        except Exception as e:
-                            print(f"Error processing file {page_path}: {e}")
-                    else:
-                        print(f"Warning: Page file not found: {page_path}")
+                    if match:
+                        # Replace with download link and online reading link for txt files
+                        download_link = f'下载: <a href="../{new_filename}" download>{new_filename}</a>'
+                        online_read_link = ''
+                        if new_filename.lower().endswith('.txt'):
+                            online_read_link = f'\n<a href="../{new_filename}" download onclick="this.href=\'https://app.webnovel.win/?add=\'+encodeURIComponent(this.getAttribute(\'href\'))">在线阅读 {new_filename}</a>'
                         
-            except Exception as e:
-                print(f"Error processing config at {config_path}: {e}")
+                        updated_content = DOWNLOAD_BLOCK_PATTERN.sub(
+                            f'<!-- tcd_download_link -->\n{download_link}\n\n{online_read_link}\n<!-- tcd_download_link_end -->',
+                            content
+                        )
+
+                        if content != updated_content:
+                            with open(page_path, 'w', encoding='utf-8') as file:
+                                file.write(updated_content)
+                            print(f"Updated links in: {page_path}")
+                            st = os.stat(page_path)
+                            entry = [st.st_mtime_ns, st.st_size, new_filename]
+                    new_link_cache[rel_path] = entry
+                except FileNotFoundError:
+                    print(f"Warning: Page file not found: {page_path}")
+                except Exception as e:
+                    print(f"Error processing file {page_path}: {e}")
+                    
+        except Exception as e:
+            print(f"Error processing config at {config_path}: {e}")
+
+    if new_link_cache != link_cache:
+        save_link_cache(cache_path, new_link_cache)
 
 def rename_main(base_path: Optional[str] = None) -> None:
     """
@@ -104,8 +173,8 @@ def rename_main(base_path: Optional[str] = None) -> None:
         base_path (Optional[str]): Base directory path to process. Defaults to current directory.
     """
     directory = base_path if base_path is not None else '.'
-    rename_files_in_directory(directory)
-    update_download_links(directory)
+    config_paths = rename_files_in_directory(directory)
+    update_download_links(directory, config_paths=config_paths)
 
 if __name__ == "__main__":
     rename_main() 
\ No newline at end of file
@@ -2,17 +2,22 @@ import os
 import json
 import argparse
 import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Add parent directory to path for imports
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(os.path.dirname(os.path.dirname(current_dir)))
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+from scripts.file.utils import write_json
 
 def read_json(file_path):
     """Read and parse JSON file."""
     with open(file_path, 'r', encoding='utf-8') as file:
         return json.load(file)
 
-def write_json(file_path, data):
-    """Write data to JSON file."""
-    with open(file_path, 'w', encoding='utf-8') as file:
-        json.dump(data, file, indent=2, ensure_ascii=False)
-
 def read_file(file_path):
     """Read content from a file."""
     with open(file_path, 'r', encoding='utf-8') as file:
@@ -29,20 +34,22 @@ def process_docs_directory(docs_dir, config_path):
     files_to_translate = config.get("files-to-translate", [])
 
     for root, _, files in os.walk(docs_dir):
+        # Targets live next to their sources, so the listing answers existence checks
+        existing = set(files)
         for file in files:
             if file.endswith('.md'):
                 md_path = os.path.join(root, file)
                 
                 if file.endswith('.zh.md'):
-                    en_path = os.path.join(root, file[:-6] + '.md')
+                    target_name = file[:-6] + '.md'
                     source_lang, target_lang = "Chinese", "English"
-                    source_path, target_path = md_path, en_path
                 else:
-                    zh_path = os.path.join(root, file[:-3] + '.zh.md')
+                    target_name = file[:-3] + '.zh.md'
                     source_lang, target_lang = "English", "Chinese"
-                    source_path, target_path = md_path, zh_path
+                source_path, target_path = md_path, os.path.join(root, target_name)
 
-                if not os.path.exists(target_path):
+                if target_name not in existing:
+                    existing.add(target_name)
                     # Copy content from source to target and add prompt
                     content = read_file(source_path)
                     prompt = f"Translate the following content from {source_lang} to {target_lang}:\n\n"
@@ -57,33 +64,38 @@ def process_docs_directory(docs_dir, config_path):
     write_json(config_path, config)
     print(f"Updated config file: {config_path}")
 
+# gen.py mostly waits on the model API, so several files can be translated at once
+TRANSLATE_WORKERS = 8
+
+def translate_file(file_path):
+    """Translate one file in place with gen.py."""
+    subprocess.run(["python3", ".github/manage/gen.py", file_path, file_path], check=True)
+
 def translate_files(config_path):
     """Process files in config.json and translate them using gen.py"""
     config = read_json(config_path)
     files_to_translate = config.get("files-to-translate", [])
-
-    for file_path in files_to_translate:
-        input_file = file_path
-        output_file = file_path
-        
-        try:
-            subprocess.run(["python3", ".github/manage/gen.py", input_file, output_file], check=True)
-            print(f"Translated: {input_file} -> {output_file}")
-            
-            # Replace the original file with the translated one
-            # os.replace(output_file, input_file)
-            # print(f"Replaced original file with translated content: {input_file}")
-            
-            # Remove the file from the list
-            files_to_translate.remove(file_path)
-            # remove from the json
-            config["files-to-translate"] = files_to_translate
+    translated = set()
+
+    with ThreadPoolExecutor(max_workers=TRANSLATE_WORKERS) as executor:
+        futures = {executor.submit(translate_file, file_path): file_path for file_path in files_to_translate}
+        for future in as_completed(futures):
+            file_path = futures[future]
+            try:
+                future.result()
+            except subprocess.CalledProcessError as e:
+                print(f"Error translating {file_path}: {e}")
+                continue
+            print(f"Translated: {file_path} -> {file_path}")
+
+            # Remove the file from the list, saving after each one so finished
+            # translations are not redone if the run is interrupted
+            translated.add(file_path)
+            config["files-to-translate"] = [f for f in files_to_translate if f not in translated]
             write_json(config_path, config)
-        except subprocess.CalledProcessError as e:
-            print(f"Error translating {input_file}: {e}")
 
     # Update the config file with the remaining files to translate
-    config["files-to-translate"] = files_to_translate
+    config["files-to-translate"] = [f for f in files_to_translate if f not in translated]
     write_json(config_path, config)
     print(f"Updated config file: {config_path}")
 
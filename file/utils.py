@@ -0,0 +1,234 @@
+import atexit
+import copy
+import datetime
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import yaml
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Caches live here, outside the archive repository: its CI commits the whole
+# working tree, so anything written inside it would be committed and pushed
+CACHE_ROOT = os.path.abspath(os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+    'autoarchive'
+))
+
+def cache_file_path(name, tree_dir=None):
+    """
+    Path of cache file name under CACHE_ROOT. Caches that describe one
+    archive tree pass its directory, which gets a subdirectory of its own.
+    """
+    if tree_dir is None:
+        return os.path.join(CACHE_ROOT, name)
+    tree_key = hashlib.sha1(os.path.abspath(tree_dir).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(CACHE_ROOT, tree_key, name)
+
+# Parsed config files keyed by path, with the (mtime_ns, size) they were parsed at.
+# Shared by every script that runs in the same process, so a config.yml read by
+# rename is not parsed again by gen_search_index, add_search_exclude or embed_text.
+YAML_CACHE_SIZE = 100
+_yaml_cache = OrderedDict()
+
+# The same parses are kept on disk between runs, as JSON so that loading the cache
+# can never run code. Entries are keyed by absolute path, so one file serves every tree.
+YAML_DISK_CACHE_PATH = cache_file_path('yaml_cache.json')
+YAML_DISK_CACHE_VERSION = 2
+_disk_cache = None
+_disk_cache_dirty = False
+
+def to_json_value(value):
+    """
+    Convert parsed YAML to JSON-safe data. Every mapping is wrapped as
+    {'map': {...}} and dates as {'date': ...} or {'datetime': ...}, so a JSON
+    object in the result is always a wrapper and never collides with data.
+    Raises TypeError for anything JSON cannot hold faithfully (e.g. non-string keys).
+    """
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    if isinstance(value, list):
+        return [to_json_value(item) for item in value]
+    if isinstance(value, dict):
+        if not all(isinstance(key, str) for key in value):
+            raise TypeError('non-string key')
+        return {'map': {key: to_json_value(item) for key, item in value.items()}}
+    if isinstance(value, datetime.datetime):
+        return {'datetime': value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {'date': value.isoformat()}
+    raise TypeError(f'cannot cache {type(value).__name__}')
+
+def from_json_value(value):
+    """Undo to_json_value."""
+    if isinstance(value, list):
+        return [from_json_value(item) for item in value]
+    if isinstance(value, dict):
+        if 'map' in value:
+            return {key: from_json_value(item) for key, item in value['map'].items()}
+        if 'datetime' in value:
+            return datetime.datetime.fromisoformat(value['datetime'])
+        return datetime.date.fromisoformat(value['date'])
+    return value
+
+def _get_disk_cache():
+    global _disk_cache
+    if _disk_cache is None:
+        _disk_cache = {}
+        try:
+            with open(YAML_DISK_CACHE_PATH, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+            if cache.get('version') == YAML_DISK_CACHE_VERSION:
+                _disk_cache = cache['files']
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass
+    return _disk_cache
+
+def save_yaml_disk_cache():
+    """
+    Write the on-disk parse cache if this run added to it, dropping files that
+    no longer exist. Registered with atexit, so scripts need not call it.
+    """
+    global _disk_cache_dirty
+    if not _disk_cache_dirty:
+        return
+    files = {path: entry for path, entry in _disk_cache.items() if os.path.exists(path)}
+    try:
+        os.makedirs(os.path.dirname(YAML_DISK_CACHE_PATH), exist_ok=True)
+        tmp_path = YAML_DISK_CACHE_PATH + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': YAML_DISK_CACHE_VERSION, 'files': files}, f, ensure_ascii=False)
+        os.replace(tmp_path, YAML_DISK_CACHE_PATH)
+        _disk_cache_dirty = False
+    except OSError as e:
+        print(f"Error saving YAML cache {YAML_DISK_CACHE_PATH}: {e}")
+
+atexit.register(save_yaml_disk_cache)
+
+def load_yaml(file_path):
+    """
+    Load a YAML file, reusing the previous parse while the file is unchanged.
+    Returns None if the file cannot be parsed.
+    """
+    global _disk_cache_dirty
+    st = os.stat(file_path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    key = os.path.abspath(file_path)
+    cached = _yaml_cache.get(key)
+    if cached is not None and cached[0] == stamp:
+        _yaml_cache.move_to_end(key)
+        # Callers may modify what they get back, so never hand out the cached object
+        return copy.deepcopy(cached[1])
+
+    disk_cache = _get_disk_cache()
+    entry = disk_cache.get(key)
+    if entry is not None and tuple(entry[:2]) == stamp:
+        data = from_json_value(entry[2])
+    else:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            try:
+                data = yaml.load(f, Loader=SafeLoader)
+            except yaml.YAMLError as e:
+                print(f"Error parsing {file_path}: {e}")
+                return None
+        try:
+            disk_cache[key] = [st.st_mtime_ns, st.st_size, to_json_value(data)]
+            _disk_cache_dirty = True
+        except TypeError:
+            # Not representable in JSON; it is still cached for this process
+            disk_cache.pop(key, None)
+
+    _yaml_cache[key] = (stamp, data)
+    _yaml_cache.move_to_end(key)
+    if len(_yaml_cache) > YAML_CACHE_SIZE:
+        _yaml_cache.popitem(last=False)
+    return copy.deepcopy(data)
+
+def write_json(file_path, data):
+    """Write data to an indented JSON file, via orjson when it is installed."""
+    if orjson is not None:
+        with open(file_path, 'wb') as file:
+            file.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+        return
+    with open(file_path, 'w', encoding='utf-8') as file:
+        json.dump(data, file, indent=2, ensure_ascii=False)
+
+# Directories never searched for config.yml
+SKIP_DIRS = frozenset({'docs', '.git'})
+
+def iter_config_dirs(root_dir, max_depth=None):
+    """
+    Yield every directory under root_dir (within max_depth levels) that holds a
+    config.yml, top-down in the same order as os.walk. Uses os.scandir directly
+    so no per-directory file and dir lists are built.
+    """
+    stack = [(root_dir, 0)]
+    while stack:
+        directory, depth = stack.pop()
+        subdirs = []
+        has_config = False
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in SKIP_DIRS:
+                            subdirs.append(entry.path)
+                    elif entry.name == 'config.yml':
+                        has_config = True
+        except OSError:
+            continue
+        if has_config:
+            yield directory
+        if max_depth is None or depth < max_depth:
+            stack.extend((subdir, depth + 1) for subdir in reversed(subdirs))
+
+# Below this many configs, starting a thread pool costs more than it saves
+PARALLEL_THRESHOLD = 32
+
+def map_configs(func, config_paths):
+    """
+    Apply func to each config path and return the results in order, on a
+    thread pool when there are enough configs for it to pay off.
+    """
+    if len(config_paths) < PARALLEL_THRESHOLD:
+        return [func(config_path) for config_path in config_paths]
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        return list(executor.map(func, config_paths))
+
+class FileKeysConfigLoader(SafeLoader):
+    """
+    Loader that builds only the FILE_KEYS of each 'files' entry of a config.yml
+    and skips everything else. The document is still parsed in full, but the
+    other metadata is never turned into Python objects. Subclasses set FILE_KEYS.
+    """
+    FILE_KEYS = frozenset()
+
+    def construct_document(self, node):
+        if not isinstance(node, yaml.MappingNode):
+            return super().construct_document(node)
+        config = {}
+        for key_node, value_node in node.value:
+            if key_node.value != 'files' or not isinstance(value_node, yaml.SequenceNode):
+                continue
+            files = []
+            for item in value_node.value:
+                if not isinstance(item, yaml.MappingNode):
+                    continue
+                files.append({
+                    field_node.value: self.construct_object(field_value, deep=True)
+                    for field_node, field_value in item.value
+                    if isinstance(field_node, yaml.ScalarNode) and field_node.value in self.FILE_KEYS
+                })
+            config['files'] = files
+        self.constructed_objects = {}
+        self.recursive_objects = {}
+        return config
@@ -1,42 +1,62 @@
 import os
+import re
 import yaml
 import sys
 from pathlib import Path
+from ..file.utils import map_configs, iter_config_dirs, FileKeysConfigLoader
 
-def check_file_size(file_path, size_limit_mb=24):
+# Download link block in a page, found with a single scan
+DOWNLOAD_BLOCK_PATTERN = re.compile(r'(<!-- tcd_download_link -->)(.*?)(<!-- tcd_download_link_end -->)', re.DOTALL)
+
+# Files above this size are reported; kept in bytes so the check is an integer compare
+SIZE_LIMIT_MB = 24
+SIZE_LIMIT_BYTES = SIZE_LIMIT_MB * 1024 * 1024
+
+def check_file_size(file_path, size_limit_bytes=SIZE_LIMIT_BYTES):
     """
-    Check if file exists and is larger than size_limit_mb
+    Check if file exists and is larger than size_limit_bytes; returns (is_large, size_mb)
     """
     try:
-        if os.path.exists(file_path):
-            size_mb = os.path.getsize(file_path) / (1024 * 1024)  # Convert to MB
-            return size_mb > size_limit_mb, size_mb
+        size = os.stat(file_path).st_size
+    except FileNotFoundError:
         return False, 0
     except Exception as e:
         print(f"Error checking size for {file_path}: {e}")
         return False, 0
+    return size > size_limit_bytes, size / (1024 * 1024)  # Convert to MB
+
+class FilesConfigLoader(FileKeysConfigLoader):
+    """Loader that builds only the filename/page keys of a config.yml's 'files' entries"""
+    FILE_KEYS = frozenset({'filename', 'page'})
 
 def process_config_file(config_path):
     """
     Process a config file and check sizes of referenced files
     """
     try:
-        with open(config_path, 'r', encoding='utf-8') as f:
-            config = yaml.safe_load(f)
+        raw = Path(config_path).read_bytes()
+        # Configs that list no files (navigation-only nodes) need no parsing
+        if b'files' not in raw:
+            return []
+        # libyaml reads the raw UTF-8 bytes itself, no text wrapper needed
+        config = yaml.load(raw, Loader=FilesConfigLoader)
             
         large_files = []
         if isinstance(config, dict) and 'files' in config:
-            config_dir = Path(config_path).parent
+            # Plain string joins; normalized once so paths match what Path() produced
+            config_dir = os.path.normpath(os.path.dirname(config_path))
+            if config_dir == '.':
+                config_dir = ''
             for file_info in config['files']:
                 if 'filename' in file_info:
-                    file_path = str(config_dir / file_info['filename'])
+                    file_path = os.path.join(config_dir, file_info['filename'])
                     is_large, size_mb = check_file_size(file_path)
                     if is_large:
                         large_files.append({
                             'name': file_info['filename'],
                             'path': file_path,
                             'size_mb': round(size_mb, 2),
-                            'page': str(config_dir / file_info.get('page', ''))  # Add page path
+                            'page': os.path.join(config_dir, file_info.get('page', ''))  # Add page path
                         })
         return large_files
     except Exception as e:
@@ -45,7 +65,8 @@ def process_config_file(config_path):
 
 def parse_gitmodules(repo_root):
     """
-    Parse the .gitmodules file and return a mapping of submodule paths to their URLs
+    Parse the .gitmodules file and return a mapping of submodule paths to their URLs,
+    with paths using '/' and without a trailing slash, and URLs without '.git'
     """
     gitmodules_path = os.path.join(repo_root, '.gitmodules')
     submodules = {}
@@ -64,60 +85,64 @@ def parse_gitmodules(repo_root):
             elif line.startswith('url ='):
                 current_url = line.split('=', 1)[1].strip()
             if current_path and current_url:
-                submodules[current_path] = current_url
+                # Normalize once here rather than on every lookup
+                path = current_path.replace('\\', '/').rstrip('/')
+                url = current_url[:-4] if current_url.endswith('.git') else current_url
+                submodules[path] = url
     return submodules
 
-def update_page_content(page_path, filename, submodules):
+def index_submodules(submodules):
+    """
+    Group submodules by their first path segment, longest path first, so a
+    file is only compared with the submodules that could contain it.
+    """
+    submodules_by_top = {}
+    for path, url in sorted(submodules.items(), key=lambda item: -len(item[0])):
+        submodules_by_top.setdefault(path.split('/', 1)[0], []).append((path, url))
+    return submodules_by_top
+
+def update_page_content(page_path, filename, submodules_by_top, repo_root):
     """
     Update the page content to replace download link with GitHub raw link,
     handling git submodules if necessary
     """
     try:
-        if os.path.exists(page_path):
-            with open(page_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Get relative path from repo root
-            repo_root = os.path.abspath('./')
-            file_abs_path = os.path.abspath(os.path.join(os.path.dirname(page_path), filename))
-            rel_path = os.path.relpath(file_abs_path, repo_root).replace('\\', '/')
-            
-            # Determine if the file is in a submodule
-            github_raw_url = ""
-            in_submodule = False
-            for submodule_path, submodule_repo in submodules.items():
-                submodule_path = submodule_path.replace('\\', '/').rstrip('/')
-                if rel_path.startswith(submodule_path):
-                    # File is in this submodule
-                    in_submodule = True
-                    sub_rel_path = rel_path[len(submodule_path):].lstrip('/')
-                    # Adjust submodule_repo URL to get raw URL
-                    if submodule_repo.endswith('.git'):
-                        submodule_repo = submodule_repo[:-4]
-                    github_raw_url = f"{submodule_repo}/raw/HEAD/{sub_rel_path}"
-                    break
-            if not in_submodule:
-                # Use main repo URL
-                github_raw_url = f"https://raw.githubusercontent.com/transTerminus/trans-digital-cn/refs/heads/main/{rel_path}"
-            
-            # Replace content between markers
-            start_marker = "<!-- tcd_download_link -->"
-            end_marker = "<!-- tcd_download_link_end -->"
+        try:
+            content = Path(page_path).read_text(encoding='utf-8')
+        except FileNotFoundError:
+            return
+        
+        # Get relative path from repo root; joining onto the absolute
+        # repo_root keeps abspath/relpath from calling getcwd per file
+        file_abs_path = os.path.normpath(os.path.join(repo_root, os.path.dirname(page_path), filename))
+        rel_path = os.path.relpath(file_abs_path, repo_root).replace('\\', '/')
+        
+        # Determine if the file is in a submodule
+        github_raw_url = ""
+        in_submodule = False
+        for submodule_path, submodule_repo in submodules_by_top.get(rel_path.split('/', 1)[0], ()):
+            if rel_path.startswith(submodule_path + '/'):
+                # File is in this submodule
+                in_submodule = True
+                sub_rel_path = rel_path[len(submodule_path):].lstrip('/')
+                github_raw_url = f"{submodule_repo}/raw/HEAD/{sub_rel_path}"
+                break
+        if not in_submodule:
+            # Use main repo URL
+            github_raw_url = f"https://raw.githubusercontent.com/transTerminus/trans-digital-cn/refs/heads/main/{rel_path}"
+        
+        # Replace content between markers
+        block_match = DOWNLOAD_BLOCK_PATTERN.search(content)
+        if block_match:
+            new_content = (
+                content[:block_match.end(1)] +
+                "\n" + f"Download: [{filename}]({github_raw_url})" + "\n" +
+                content[block_match.start(3):]
+            )
             
-            start_idx = content.find(start_marker)
-            end_idx = content.find(end_marker)
+            Path(page_path).write_text(new_content, encoding='utf-8')
+            print(f"Updated {page_path} with GitHub raw link")
             
-            if start_idx != -1 and end_idx != -1:
-                new_content = (
-                    content[:start_idx + len(start_marker)] +
-                    "\n" + f"Download: [{filename}]({github_raw_url})" + "\n" +
-                    content[end_idx:]
-                )
-                
-                with open(page_path, 'w', encoding='utf-8') as f:
-                    f.write(new_content)
-                print(f"Updated {page_path} with GitHub raw link")
-                
     except Exception as e:
         print(f"Error updating page content for {page_path}: {e}")
 
@@ -127,16 +152,11 @@ def find_large_files(root_dir):
     """
     large_files = []
     
-    for root, dirs, files in os.walk(root_dir):
-        # Skip docs directory
-        if 'docs' in dirs:
-            dirs.remove('docs')
-            
-        if 'config.yml' in files:
-            config_path = os.path.join(root, 'config.yml')
-            print(f"Checking {config_path}")
-            found_files = process_config_file(config_path)
-            large_files.extend(found_files)
+    config_paths = [os.path.join(root, 'config.yml') for root in iter_config_dirs(root_dir)]
+    for config_path in config_paths:
+        print(f"Checking {config_path}")
+    for found_files in map_configs(process_config_file, config_paths):
+        large_files.extend(found_files)
     
     return large_files
 
@@ -144,7 +164,7 @@ def main():
     try:
         root_dir = "./"
         repo_root = os.path.abspath(root_dir)
-        submodules = parse_gitmodules(repo_root)
+        submodules_by_top = index_submodules(parse_gitmodules(repo_root))
         large_files = find_large_files(root_dir)
         
         if large_files:
@@ -155,13 +175,15 @@ def main():
                 print(f"Size: {file_info['size_mb']} MB")
                 
                 # Remove large file
-                if os.path.exists(file_info['path']):
+                try:
                     os.remove(file_info['path'])
                     print(f"Removed large file: {file_info['path']}")
+                except FileNotFoundError:
+                    pass
                 
                 # Update page content if page path exists
                 if file_info.get('page'):
-                    update_page_content(file_info['page'], file_info['name'], submodules)
+                    update_page_content(file_info['page'], file_info['name'], submodules_by_top, repo_root)
                         
             print(f"\nTotal large files found and processed: {len(large_files)}")
             sys.exit(0)
@@ -1,61 +1,58 @@
 import os
-import yaml
+import re
+from pathlib import Path
+from ..file.utils import load_yaml
+
+# Second-level (or deeper) headings not yet marked as excluded from search
+UNMARKED_HEADING_PATTERN = re.compile(r'^##(?!.*\{ data-search-exclude \}).*$', re.MULTILINE)
+# Inserted after the title unless the page already has it
+BODY_HEADING = '\n\n## 正文 { data-search-exclude }\n'
 
 def process_markdown_file(file_path):
     """Process a single markdown file to add search exclude marker after first title."""
-    with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-        
-    # Split content into lines
-    lines = content.split('\n')
-    new_lines = []
-    title_found = False
-    
-    # Process lines to ensure first heading is single # and add search exclude
-    first_heading = True
-    for line in lines:
-        if first_heading:
-            # If first heading starts with more than one #, convert to single #
-            if line.startswith('##'):
-                # Count leading #s and get the title text
-                heading_text = line.lstrip('#').strip()
-                new_lines.append(f'# {heading_text}')
-            elif not line.startswith('#'):
-                # add # to the first heading
-                new_lines.append(f'# {line}')
-            else:
-                new_lines.append(line)
-        elif line.startswith('##'):
-            # Check if data-search-exclude is already present
-            if '{ data-search-exclude }' not in line:
-                new_lines.append(f'{line} {{ data-search-exclude }}')
-            else:
-                new_lines.append(line)
-        else:
-            new_lines.append(line)
+    try:
+        content = Path(file_path).read_text(encoding='utf-8')
+    except FileNotFoundError:
+        return
 
-        # Add the search exclude marker after the first title
-        if not title_found and first_heading and '正文 { data-search-exclude }' not in content:
-            new_lines.append('')  # Add blank line
-            new_lines.append('## 正文 { data-search-exclude }')
-            new_lines.append('')  # Add blank line
-            title_found = True
-        
-        first_heading = False
+    first_line, newline, rest = content.partition('\n')
+    changed = True
+
+    # Ensure the first heading is a single #
+    if first_line.startswith('##'):
+        # Strip leading #s and keep the title text
+        first_line = f"# {first_line.lstrip('#').strip()}"
+    elif not first_line.startswith('#'):
+        # add # to the first heading
+        first_line = f'# {first_line}'
+    else:
+        changed = False
 
-    # Write modified content back to file
-    with open(file_path, 'w', encoding='utf-8') as f:
-        f.write('\n'.join(new_lines))
+    # Mark every later ## heading in one pass over the text
+    rest, marked = UNMARKED_HEADING_PATTERN.subn(r'\g<0> { data-search-exclude }', rest)
+    changed = changed or marked > 0
+
+    # Add the search exclude marker after the first title
+    if '正文 { data-search-exclude }' not in content:
+        first_line += BODY_HEADING
+        changed = True
+
+    # Already conformed: skip rebuilding the text and rewriting the file
+    if not changed:
+        return
+    Path(file_path).write_text(first_line + newline + rest, encoding='utf-8')
 
 def add_search_exclude(directory):
     """Process markdown files to add search exclude marker after first title."""
     config_path = os.path.join(directory, 'config.yml')
-    if not os.path.exists(config_path):
-        return
     
-    # Read config
-    with open(config_path, 'r', encoding='utf-8') as f:
-        config = yaml.safe_load(f)
+    # Read config; the parse is shared with the other passes over the same tree
+    try:
+        config = load_yaml(config_path)
+    except FileNotFoundError:
+        return
+    if not isinstance(config, dict):
+        return
     
     # Process each markdown file
     for file_info in config.get('files', []):
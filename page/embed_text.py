@@ -1,31 +1,70 @@
+import io
+import mmap
 import os
 import subprocess
 import re
-import yaml
 import argparse
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+from ..file.utils import load_yaml
+
+# Converted text longer than this many UTF-8 bytes is truncated
+TEXT_LIMIT_BYTES = 100 * 1024  # 100KB
+
+def exceeds_utf8_length(text, limit):
+    """Check whether text encodes to more than limit UTF-8 bytes, encoding only when unavoidable"""
+    # Every character takes between 1 and 4 bytes in UTF-8
+    if len(text) > limit:
+        return True
+    if len(text) * 4 <= limit:
+        return False
+    # ASCII text is one byte per character; isascii() reads a flag CPython
+    # keeps on every str, so this costs nothing
+    if text.isascii():
+        return False
+    return len(text.encode('utf-8')) > limit
 
 # if file content is > 500KB, add noticce
 def check_text_length_and_add_notice(converted_text):
-    if len(converted_text.encode('utf-8')) > 100 * 1024:  # 100KB
+    if exceeds_utf8_length(converted_text, TEXT_LIMIT_BYTES):
         notice = "\n\n文件内容超过上限。请下载txt文件获取完整版。\n"
-        converted_text = converted_text[:100 * 1024] + notice
+        converted_text = converted_text[:TEXT_LIMIT_BYTES] + notice
         print("Notice added to the text. Please download the txt file and truncate the content.")
     return converted_text
 
-def convert_doc_to_text(filepath):
-    """Convert doc/docx to text, with error handling"""
+def run_converter(cmd, max_chars=-1):
+    """
+    Run a converter and read at most max_chars characters of its output (-1 for all).
+    Raises CalledProcessError if it fails before its output was cut short.
+    """
+    with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL) as proc:
+        # Decoded the same way as text=True, newline translation included
+        output = io.TextIOWrapper(proc.stdout).read(max_chars)
+        if 0 <= max_chars <= len(output):
+            # The rest will not be used; stop the converter instead of draining it
+            proc.kill()
+            return output
+    if proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode, cmd)
+    return output
+
+def converter_command(filepath):
+    """Command that prints filepath as text, or None if it needs no converter"""
+    if filepath.endswith('.docx'):
+        return ['pandoc', '-f', 'docx', '-t', 'markdown', filepath]
+    elif filepath.endswith('.doc'):
+        return ['antiword', filepath]
+    return None
+
+def convert_doc_to_text(filepath, max_chars=-1):
+    """Convert doc/docx to text, with error handling; reads at most max_chars characters (-1 for all)"""
     try:
-        if filepath.endswith('.docx'):
-            result = subprocess.run(['pandoc', '-f', 'docx', '-t', 'markdown', filepath], 
-                                  capture_output=True, text=True, check=True)
-            return result.stdout
-        elif filepath.endswith('.doc'):
-            result = subprocess.run(['antiword', filepath], 
-                                  capture_output=True, text=True, check=True)
-            return result.stdout
+        cmd = converter_command(filepath)
+        if cmd:
+            return run_converter(cmd, max_chars)
         elif filepath.endswith('.txt'):
             with open(filepath, 'r') as file:
-                return file.read()
+                return file.read(max_chars)
     except subprocess.CalledProcessError as e:
         print(f"Error converting {filepath}: {e}")
     except Exception as e:
@@ -34,63 +73,83 @@ def convert_doc_to_text(filepath):
 
 def get_file_mapping_from_config(config_path):
     """Read config.yml and return filename->page mapping"""
-    with open(config_path, 'r', encoding='utf-8') as f:
-        config = yaml.safe_load(f)
+    # The parse is shared with the other passes over the same tree
+    config = load_yaml(config_path)
     
     mapping = {}
-    if 'files' in config:
+    if isinstance(config, dict) and 'files' in config:
         for file in config.get('files', []):
             if 'filename' in file and 'page' in file:
                 mapping[file['filename']] = file['page']
     return mapping
 
-SPECIAL_CHARS = r"""
-        \s          # spaces and whitespace
-        \d          # digits
-        a-zA-Z      # letters
-        \~\`        # tildes and backticks
-        \!\@\#\$   # common special chars
-        \%\^\&\*   # more special chars
-        \(\)\[\]   # brackets
-        \{\}\<\>   # angle brackets
-        \-\_\+\=   # math symbols
-        \|\\\/'    # slashes and vertical bar
-        \"\;\:\,   # punctuation
-        \.\?・      # dots and question marks
-    """
+# Character class body shared by the control-line and trailing-chars patterns:
+# whitespace, digits, ASCII letters, ASCII punctuation and the katakana middle dot
+SPECIAL_CHARS_CLASS = (
+    r"\s"                  # spaces and whitespace
+    r"\d"                  # digits
+    r"a-zA-Z"              # letters
+    r"\~\`"                # tildes and backticks
+    r"\!\@\#\$"            # common special chars
+    r"\%\^\&\*"            # more special chars
+    r"\(\)\[\]"            # brackets
+    r"\{\}\<\>"            # angle brackets
+    r"\-\_\+\="            # math symbols
+    r"\|\\\/'"             # slashes and vertical bar
+    r"\"\;\:\,"            # punctuation
+    r"\.\?・"              # dots and question marks
+)
+
+# Compiled once; these run on every line of every converted document
+CONTROL_LINE_PATTERN = re.compile(f"^[{SPECIAL_CHARS_CLASS}]*$")
+REQUIRED_CHARS_PATTERN = re.compile(r'[\d\~\^\?\:\)\!\@\#\$\%\^\&\*\(\)\[\]\{\}\<\>\_\+\-\=\|\\\/\'\"\`\;\,]')
+TRAILING_SPECIAL_PATTERN = re.compile(f"[{SPECIAL_CHARS_CLASS}]{{8,}}$")
+BACKSLASH_RUN_PATTERN = re.compile(r'\\+\s*')
+# Advertising markers left in converted novels, removed one after another:
+# stripping a marker can expose the wrappers of the next, so one alternation
+# would not remove the same text
+ADVERTISING_MARKERS = [
+    '24小时在线客服',
+    '唯一联系方式',
+    '646208907',
+    '2775269676',
+    '终身免费更',
+    '更全小说等',
+    '缺失章节等',
+    '一次购买',
+    '以及备用QQ',
+    '漫画视频账号',
+]
+ADVERTISING_PATTERNS = [
+    (marker, re.compile(r'\\*\s*\[*\.?' + re.escape(marker) + r'\.*\]*'))
+    for marker in ADVERTISING_MARKERS
+]
+DOWNLOAD_LINK_PATTERN = re.compile(r'<!--\s*tcd_download_link\s*-->\n(.*?)\n<!--\s*tcd_download_link_end\s*-->', re.DOTALL)
+# Link text of the download line, used as the document name when the config has none
+LINK_TEXT_PATTERN = re.compile(r'\[(.*?)\]')
 
 def is_control_sequence_line(line):
     """Check if line contains only control characters"""
-    # All possible special chars and patterns
-    pattern = f"^[{SPECIAL_CHARS.replace(' ','').replace('#.*\n','')}]*$"
-    
-    has_only_controls = bool(re.match(pattern, line, re.VERBOSE))
-    has_required_chars = bool(re.search(r'[\d\~\^\?\:\)\!\@\#\$\%\^\&\*\(\)\[\]\{\}\<\>\_\+\-\=\|\\\/\'\"\`\;\,]', line))
-    no_chinese = not bool(re.search(r'[\u4e00-\u9fff]', line))
-    
-    return has_only_controls and has_required_chars and no_chinese
+    # The anchored match stops at the first character outside the class, so it
+    # rejects ordinary text lines almost immediately; try it first. A line it
+    # accepts cannot contain Chinese characters, which are outside the class.
+    if not CONTROL_LINE_PATTERN.match(line):
+        return False
+    return bool(REQUIRED_CHARS_PATTERN.search(line))
 
 def strip_trailing_special_chars(line):
     """Strip special characters from end of line if there are 8+ consecutive special chars"""
-    pattern = f"[{SPECIAL_CHARS.replace(' ','').replace('#.*\n','')}]{{8,}}$"
-    return re.sub(pattern, '', line, flags=re.VERBOSE)
+    return TRAILING_SPECIAL_PATTERN.sub('', line)
 
 def clean_control_sequences(text):
     """Clean control sequences and special markers from text"""
     
-    text = re.sub(r'\\*\s*\[*\.?24小时在线客服\.*\]*', '', text)
-    text = re.sub(r'\\*\s*\[*\.?唯一联系方式\.*\]*', '', text)
-    text = re.sub(r'\\*\s*\[*\.?646208907\.*\]*', '', text)
-    text = re.sub(r'\\*\s*\[*\.?2775269676\.*\]*', '', text)
-    text = re.sub(r'\\*\s*\[*\.?终身免费更\.*\]*', '', text)
-    text = re.sub(r'\\*\s*\[*\.?更全小说等\.*\]*', '', text)
-    text = re.sub(r'\\*\s*\[*\.?缺失章节等\.*\]*', '', text)
-    text = re.sub(r'\\*\s*\[*\.?一次购买\.*\]*', '', text)
-    text = re.sub(r'\\*\s*\[*\.?以及备用QQ\.*\]*', '', text)
-    text = re.sub(r'\\*\s*\[*\.?漫画视频账号\.*\]*', '', text)
+    for marker, pattern in ADVERTISING_PATTERNS:
+        if marker in text:
+            text = pattern.sub('', text)
 
     # strip '#' in all lines
-    text = re.sub(r'#', '', text)
+    text = text.replace('#', '')
     
     # Split into lines
     lines = text.split('\n')
@@ -109,9 +168,11 @@ def clean_control_sequences(text):
     # Remove common advertising markers
     
     # Clean remaining control sequences
-    text = re.sub(r'\\+\s*', ' ', text)
-    text = re.sub(r'\\([^\\])', r'\1', text)
-    text = text.replace('\\', '')
+    # Every backslash run becomes a space here, which also covers the escaped
+    # characters and stray backslashes that later passes used to strip.
+    # Text without any (antiword output, plain .txt) skips the regex pass.
+    if '\\' in text:
+        text = BACKSLASH_RUN_PATTERN.sub(' ', text)
     # convert the single '\n' to double for markdown.
     text = text.replace('\n', '\n\n')
     return text.strip()
@@ -124,26 +185,41 @@ def create_pdf_preview_section(pdf_filename):
 </iframe>"""
     return preview_html
 
-def process_page_file(filepath, file_mapping, base_dir, remove_original):
-    """Process single markdown page file using config mapping."""
+def get_page_mapping(file_mapping):
+    """Invert a filename->page mapping; the first file listed for a page wins"""
+    page_mapping = {}
+    for filename, page in file_mapping.items():
+        page_mapping.setdefault(page, filename)
+    return page_mapping
+
+def page_has_main_text(filepath):
+    """Check for the embedded-text marker by searching a read-only mapping of the file"""
+    with open(filepath, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size:
+            # Empty files cannot be mapped
+            return False
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return mapped.find(b'tcd_main_text') != -1
+
+def process_page_file(filepath, page_mapping, base_dir, remove_original):
+    """Process single markdown page file using the page->filename mapping from config."""
     print(f"\nProcessing file: {filepath}")
     
     try:
+        # Pages that already have their text embedded are the common case on
+        # re-runs; spot them in the mapped bytes without decoding the file
+        if not remove_original and page_has_main_text(filepath):
+            print("skip because already exists")
+            return
+
         with open(filepath, 'r', encoding='utf-8') as f:
             content = f.read()
-        
-        pattern = r'<!--\s*tcd_download_link\s*-->\n(.*?)\n<!--\s*tcd_download_link_end\s*-->'
-        match = re.search(pattern, content, re.DOTALL)
 
         if "tcd_main_text" in content:
             print("skip because already exists")
             # Only remove files if they were successfully embedded before
             if remove_original:
-                doc_filename = None
-                for filename in file_mapping.keys():
-                    if file_mapping[filename] == os.path.basename(filepath):
-                        doc_filename = filename
-                        break
+                doc_filename = page_mapping.get(os.path.basename(filepath))
                 
                 if doc_filename and not doc_filename.lower().endswith('.pdf'):
                     doc_path = os.path.join(base_dir, doc_filename)
@@ -163,6 +239,7 @@ def process_page_file(filepath, file_mapping, base_dir, remove_original):
                     print(f"Removed download link and renamed: {filepath} -> {new_filepath}")
             return
         
+        match = DOWNLOAD_LINK_PATTERN.search(content)
         if not match:
             print(f"No download link found in: {filepath}")
             return
@@ -170,14 +247,10 @@ def process_page_file(filepath, file_mapping, base_dir, remove_original):
         download_text = match.group(1).strip()
         print(f"Found download text: {download_text}")
         
-        doc_filename = None
-        for filename in file_mapping.keys():
-            if file_mapping[filename] == os.path.basename(filepath):
-                doc_filename = filename
-                break
+        doc_filename = page_mapping.get(os.path.basename(filepath))
         
         if not doc_filename:
-            doc_filename = re.search(r'\[(.*?)\]', download_text)
+            doc_filename = LINK_TEXT_PATTERN.search(download_text)
             if doc_filename:
                 doc_filename = doc_filename.group(1)
         
@@ -199,7 +272,10 @@ def process_page_file(filepath, file_mapping, base_dir, remove_original):
             remove_this_file = False
         elif doc_filename.lower().endswith('.docx') or doc_filename.lower().endswith('.doc') or doc_filename.lower().endswith('.txt'):
             # Text conversion
-            converted_text = convert_doc_to_text(doc_path)
+            # Kept pages are cut to TEXT_LIMIT_BYTES characters, and one more
+            # character already shows the text is over the limit
+            max_chars = -1 if remove_original else TEXT_LIMIT_BYTES + 1
+            converted_text = convert_doc_to_text(doc_path, max_chars)
             if converted_text:
                 if not remove_original:
                     converted_text = check_text_length_and_add_notice(converted_text)
@@ -227,10 +303,9 @@ def process_page_file(filepath, file_mapping, base_dir, remove_original):
 '''
 
         if remove_this_file:
-            # Remove download link and rename file when remove_original is True
-            start = content.find('<!-- tcd_download_link -->')
-            end = content.find('<!-- tcd_download_link_end -->') + len('<!-- tcd_download_link_end -->')
-            new_content = content[:start] + content[end:] + new_section
+            # Remove download link and rename file when remove_original is True;
+            # the block is where the download link search above matched it
+            new_content = content[:match.start()] + content[match.end():] + new_section
             os.remove(doc_path)
             print(f"Removed original file: {doc_path}")
             new_filepath = filepath.replace("_page.md", ".md")
@@ -248,21 +323,43 @@ def process_page_file(filepath, file_mapping, base_dir, remove_original):
     except Exception as e:
         print(f"Error processing {filepath}: {e}")
 
+def _process_page_job(job):
+    """Run process_page_file in a worker process, returning what it printed"""
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        process_page_file(*job)
+    return log.getvalue()
+
 def embed_text_main(root_directory=".", remove_original=False):
     """Embed text from document files into markdown pages"""
     original_dir = os.getcwd()
     try:
         os.chdir(root_directory)
+        jobs = []
         for root, dirs, files in os.walk('.'):
             if 'config.yml' in files:
                 config_path = os.path.join(root, 'config.yml')
                 print(f"\nFound config at: {config_path}")
                 
                 file_mapping = get_file_mapping_from_config(config_path)
+                page_mapping = get_page_mapping(file_mapping)
                 
                 for page_file in [f for f in files if f.endswith('_page.md')]:
                     page_path = os.path.join(root, page_file)
-                    process_page_file(page_path, file_mapping, root, remove_original)
+                    jobs.append((page_path, page_mapping, root, remove_original))
+
+        # Every page writes only its own files, so pages are converted and cleaned
+        # in parallel; processes rather than threads, as cleaning is regex-bound
+        workers = os.cpu_count() or 1
+        if workers == 1 or len(jobs) < 2:
+            for job in jobs:
+                process_page_file(*job)
+        else:
+            chunksize = max(1, len(jobs) // (workers * 4))
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                # Logs are printed whole and in walk order, as a serial run would
+                for log in executor.map(_process_page_job, jobs, chunksize=chunksize):
+                    print(log, end='')
     finally:
         os.chdir(original_dir)
 
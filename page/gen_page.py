@@ -1,6 +1,21 @@
+import contextlib
+import functools
+import io
 import os
 import yaml
+try:
+    from yaml import CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeDumper
+from concurrent.futures import ProcessPoolExecutor
 from typing import Optional, Dict
+from ..file.utils import load_yaml
+
+@functools.lru_cache(maxsize=4)
+def read_template(template_path):
+    """Read a page template once per process; callers pass an absolute path."""
+    with open(template_path, 'r', encoding='utf-8') as template_file:
+        return template_file.read()
 
 def generate_metadata_page(file_info, directory):
     """Generate a markdown page for a file based on its metadata."""
@@ -30,8 +45,7 @@ def generate_metadata_page(file_info, directory):
         # Read the template file
         template_path = os.path.join('.github', 'templates', 'page.md.template')
     
-    with open(template_path, 'r', encoding='utf-8') as template_file:
-        template_content = template_file.read()
+    template_content = read_template(os.path.abspath(template_path))
     
     page_filename = f"{name}_page.md"
     # if page exists, skip
@@ -74,29 +88,60 @@ def generate_metadata_page(file_info, directory):
         # Update the file_info with the page filename
         file_info['page'] = page_filename
 
-def process_directory(directory):
-    """Process a directory to generate metadata pages for non-image files."""
+def process_config_directory(directory):
+    """Generate the metadata pages of one directory; returns the subdirectories its config lists."""
     config_path = os.path.join(directory, 'config.yml')
-    if not os.path.exists(config_path):
+    try:
+        # Parsed once per run and only re-parsed when the file changes
+        config = load_yaml(config_path)
+    except FileNotFoundError:
         # print(f"Warning: No config.yml found in {directory}")
-        return
-    
-    # Read config
-    with open(config_path, 'r', encoding='utf-8') as f:
-        config = yaml.safe_load(f)
+        return []
+    if not isinstance(config, dict):
+        return []
     
     # Generate metadata pages for each file
-    for file_info in config.get('files', []):
+    files = config.get('files', [])
+    pages_before = [file_info.get('page') for file_info in files]
+    for file_info in files:
         generate_metadata_page(file_info, directory)
     
-    # Save updated config back to config.yml
-    with open(config_path, 'w', encoding='utf-8') as f:
-        yaml.safe_dump(config, f, allow_unicode=True, sort_keys=False)
+    # Save updated config back to config.yml, unless no page entry changed
+    if [file_info.get('page') for file_info in files] != pages_before:
+        with open(config_path, 'w', encoding='utf-8') as f:
+            yaml.dump(config, f, Dumper=SafeDumper, allow_unicode=True, sort_keys=False)
     
-    # Process subdirectories
-    for subdir in config.get('subdirs', []):
-        subdir_path = os.path.join(directory, subdir)
-        process_directory(subdir_path)
+    return [os.path.join(directory, subdir) for subdir in config.get('subdirs', [])]
+
+def _process_directory_job(directory):
+    """Run process_config_directory in a worker process, returning its result and what it printed"""
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        subdirs = process_config_directory(directory)
+    return subdirs, log.getvalue()
+
+def process_directory(directory):
+    """Process a directory and its subdirectories to generate metadata pages for non-image files."""
+    # Each directory only touches its own config and pages, so the directories of
+    # one level of the tree are processed in parallel before moving a level down
+    workers = os.cpu_count() or 1
+    executor = None
+    level = [directory]
+    try:
+        while level:
+            if workers == 1 or len(level) < 2:
+                results = [(process_config_directory(path), '') for path in level]
+            else:
+                if executor is None:
+                    executor = ProcessPoolExecutor(max_workers=workers)
+                results = executor.map(_process_directory_job, level)
+            level = []
+            for subdirs, log in results:
+                print(log, end='')
+                level.extend(subdirs)
+    finally:
+        if executor is not None:
+            executor.shutdown()
 
 def gen_page_main(base_dir: str = '.', template_dir: Optional[str] = None) -> Dict:
     """
@@ -116,8 +161,7 @@ def gen_page_main(base_dir: str = '.', template_dir: Optional[str] = None) -> Di
         # Return config data from root directory
         config_path = os.path.join('.', 'config.yml')
         if os.path.exists(config_path):
-            with open(config_path, 'r', encoding='utf-8') as f:
-                return yaml.safe_load(f)
+            return load_yaml(config_path)
         return {}
     except Exception as e:
         print(f"Error generating pages: {e}")
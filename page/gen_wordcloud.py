@@ -1,7 +1,11 @@
+import contextlib
+import functools
+import io
 import os
 import re
 import jieba
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from wordcloud import WordCloud
 import matplotlib.pyplot as plt
 import numpy as np
@@ -9,15 +13,22 @@ from PIL import Image
 import yaml
 import requests
 
+ABSTRACT_PATTERN = re.compile(r'<!-- tcd_abstract -->(.*?)<!-- tcd_abstract_end -->', re.DOTALL)
+TAGS_PATTERN = re.compile(r'\|\s*Tags\s*\|\s*([^|]+?)\s*\|')
+# 摘要和标签表格都在页面开头，先只读这么多字符
+PAGE_HEAD_CHARS = 16 * 1024
+# 词云最多显示的词数
+MAX_WORDS = 100
+
 def extract_abstract(md_content):
     """提取被注释包含的abstract内容"""
-    pattern = r'<!-- tcd_abstract -->(.*?)<!-- tcd_abstract_end -->'
-    match = re.search(pattern, md_content, re.DOTALL)
+    match = ABSTRACT_PATTERN.search(md_content)
     abstract = match.group(1).strip() if match else ""
     return abstract
 
+@functools.lru_cache(maxsize=1)
 def get_stopwords():
-    """获取停用词列表"""
+    """获取停用词列表（只读取一次，所有目录共用同一个集合，调用方不要修改）"""
     # 默认的停用词列表作为备选
     default_stopwords = set(['的', '了', '和', '是', '与', '以', '及', '等', '对', '在', '中', '或', '由', '上', '下', 
                            '而', '到', '为', '与', '则', '等', '这', '那', '你', '我', '他', '她', '它', '们', '个',
@@ -30,24 +41,15 @@ def get_stopwords():
         stopwords_file = os.path.join(os.path.dirname(__file__), 'chinese_stopwords.txt')
         if os.path.exists(stopwords_file):
             with open(stopwords_file, 'r', encoding='utf-8') as f:
-                stopwords = set([line.strip() for line in f.readlines()])
+                stopwords = {line.strip() for line in f}
             return stopwords
     except Exception as e:
         print(f"Warning: Could not load stopwords file, using default stopwords. Error: {e}")
     
     return default_stopwords
 
-def generate_wordcloud(text, output_path):
-    """生成词云图片文件"""
-    # 分词
-    words = jieba.cut(text)
-    # 去除停用词
-    stopwords = get_stopwords()
-    words = [word for word in words if word not in stopwords and len(word) > 1]
-    
-    # 将分词结果组合成文本
-    text = ' '.join(words)
-    
+def find_font_path():
+    """查找可用的中文字体，找不到时下载 WQY-Microhei"""
     # Try different font paths
     possible_font_paths = [
         '/usr/share/fonts/truetype/wqy/wqy-microhei.ttc',
@@ -59,20 +61,32 @@ def generate_wordcloud(text, output_path):
         'msyh.ttc'          # Windows font
     ]
     
-    font_path = None
     for path in possible_font_paths:
         if os.path.exists(path):
-            font_path = path
-            break
+            return path
+    
+    print("Warning: Could not find a suitable font. Downloading WQY-Microhei...")
+    # Download the font if not found
+    font_url = "https://github.com/anthonyfok/fonts-wqy-microhei/raw/master/wqy-microhei.ttc"
+    response = requests.get(font_url)
+    font_path = "wqy-microhei.ttc"
+    with open(font_path, "wb") as f:
+        f.write(response.content)
+    return font_path
+
+def generate_wordcloud(text, output_path, font_path=None):
+    """生成词云图片文件"""
+    # 分词
+    words = jieba.cut(text)
+    # 去除停用词
+    stopwords = get_stopwords()
+    words = [word for word in words if word not in stopwords and len(word) > 1]
+    
+    # 直接统计词频，WordCloud 不必再把拼接的文本重新分词；只保留会显示的词
+    frequencies = dict(Counter(words).most_common(MAX_WORDS))
     
     if not font_path:
-        print("Warning: Could not find a suitable font. Downloading WQY-Microhei...")
-        # Download the font if not found
-        font_url = "https://github.com/anthonyfok/fonts-wqy-microhei/raw/master/wqy-microhei.ttc"
-        response = requests.get(font_url)
-        font_path = "wqy-microhei.ttc"
-        with open(font_path, "wb") as f:
-            f.write(response.content)
+        font_path = find_font_path()
     
     # 创建词云对象
     wc = WordCloud(
@@ -80,13 +94,13 @@ def generate_wordcloud(text, output_path):
         width=1200,
         height=800,
         background_color='white',
-        max_words=100,
+        max_words=MAX_WORDS,
         max_font_size=150,
         random_state=42
     )
     
     # 生成词云
-    wc.generate(text)
+    wc.generate_from_frequencies(frequencies)
     
     # 保存图片
     output_path = output_path.replace('.html', '.png')
@@ -95,54 +109,119 @@ def generate_wordcloud(text, output_path):
 
 def extract_tags(md_content):
     """从 markdown 表格中提取 Tags"""
-    pattern = r'\|\s*Tags\s*\|\s*([^|]+?)\s*\|'
-    match = re.search(pattern, md_content)
+    match = TAGS_PATTERN.search(md_content)
     if match:
         tags = match.group(1).strip()
         # 将逗号分隔的标签转换为空格分隔
         return tags.replace('，', ' ').replace(',', ' ')
     return ""
 
-def collect_abstracts(dir_path):
-    """递归收集指定目录及其子目录中的所有摘要和标签"""
+def read_abstract_and_tags(file_path):
+    """读取页面的摘要和标签，只读到两者都已找到为止（页面后部大多是嵌入的正文）"""
+    # A match found in the part read so far is the one a search of the whole
+    # page would find: an earlier match would have had to end inside it too
+    with open(file_path, 'r', encoding='utf-8') as f:
+        content = ''
+        size = PAGE_HEAD_CHARS
+        while True:
+            chunk = f.read(size)
+            content += chunk
+            abstract = extract_abstract(content)
+            if abstract:
+                tags = extract_tags(content)
+                if tags:
+                    return abstract, tags
+            if not chunk:
+                return abstract, extract_tags(content) if abstract else ""
+            # Double the read each time, so the searches add up to linear time
+            size = len(content)
+
+def read_directory_abstracts(root, files):
+    """读取一个目录中各 md 文件的摘要和标签（不含子目录）"""
     abstracts = []
-    
-    for root, dirs, files in os.walk(dir_path):
-        if 'config.yml' in files:
+    for file in files:
+        if file.endswith('.md'):
+            file_path = os.path.join(root, file)
+            try:
+                abstract, tags = read_abstract_and_tags(file_path)
+                if abstract:
+                    # 将标签和摘要组合在一起
+                    combined_text = f"{abstract} {tags} {file}"
+                    abstracts.append(combined_text)
+            except Exception as e:
+                print(f"Error processing {file_path}: {e}")
+    return abstracts
+
+def collect_abstracts(base_path):
+    """
+    遍历一次目录树，收集每个含 config.yml 的目录及其子目录中的所有摘要和标签。
+    返回按遍历顺序排列的 [(目录, 摘要列表)]。
+    """
+    walked = []
+    for root, dirs, files in os.walk(base_path):
+        has_config = 'config.yml' in files
+        own = []
+        if has_config:
             # rm abstracts_wordcloud.html
-            if os.path.exists(os.path.join(root, 'abstracts_wordcloud.html')):
+            try:
                 os.remove(os.path.join(root, 'abstracts_wordcloud.html'))
-            for file in files:
-                if file.endswith('.md'):
-                    file_path = os.path.join(root, file)
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                            abstract = extract_abstract(content)
-                            tags = extract_tags(content)
-                            if abstract:
-                                # 将标签和摘要组合在一起
-                                combined_text = f"{abstract} {tags} {file}"
-                                abstracts.append(combined_text)
-                    except Exception as e:
-                        print(f"Error processing {file_path}: {e}")
+            except FileNotFoundError:
+                pass
+            own = read_directory_abstracts(root, files)
+        walked.append((root, list(dirs), has_config, own))
     
-    return abstracts
+    # Children always follow their parent in walk order, so going backwards every
+    # subtree is complete before its parent; the concatenation keeps walk order
+    subtree_abstracts = {}
+    collected = {}
+    for root, dirs, has_config, own in reversed(walked):
+        abstracts = own + [abstract for d in dirs
+                           for abstract in subtree_abstracts.pop(os.path.join(root, d), [])]
+        subtree_abstracts[root] = abstracts
+        if has_config:
+            collected[root] = abstracts
+    return [(root, collected[root]) for root, _, has_config, _ in walked if has_config]
+
+def process_wordcloud_directory(root, abstracts, font_path=None):
+    """为一个含 config.yml 的目录生成词云"""
+    print(f"Processing directory: {root}")
+    
+    if abstracts:
+        combined_text = ' '.join(abstracts)
+        output_path = os.path.join(root, 'abstracts_wordcloud.html')  # 保持原文件名，在generate_wordcloud中会改为.png
+        generate_wordcloud(combined_text, output_path, font_path)
+        print(f"Generated wordcloud at: {output_path.replace('.html', '.png')}")
+    else:
+        print(f"No abstracts found in {root} or its subdirectories")
+
+def _process_wordcloud_job(job):
+    """Run process_wordcloud_directory in a worker process, returning what it printed"""
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        process_wordcloud_directory(*job)
+    return log.getvalue()
 
 def process_directory(base_path):
     """处理目录及其子目录"""
-    for root, dirs, files in os.walk(base_path):
-        if 'config.yml' in files:
-            print(f"Processing directory: {root}")
-            abstracts = collect_abstracts(root)
-            
-            if abstracts:
-                combined_text = ' '.join(abstracts)
-                output_path = os.path.join(root, 'abstracts_wordcloud.html')  # 保持原文件名，在generate_wordcloud中会改为.png
-                generate_wordcloud(combined_text, output_path)
-                print(f"Generated wordcloud at: {output_path.replace('.html', '.png')}")
-            else:
-                print(f"No abstracts found in {root} or its subdirectories")
+    directory_abstracts = collect_abstracts(base_path)
+    if not directory_abstracts:
+        return
+    
+    # 每个目录的词云互不依赖，用多进程并行生成（分词和绘图都受 GIL 限制）
+    # The font is looked up once here so that workers never download it concurrently,
+    # and only when some cloud will actually be drawn
+    font_path = None
+    if any(abstracts for _, abstracts in directory_abstracts):
+        font_path = find_font_path()
+    jobs = [(root, abstracts, font_path) for root, abstracts in directory_abstracts]
+    workers = os.cpu_count() or 1
+    if workers == 1 or len(jobs) < 2:
+        for job in jobs:
+            process_wordcloud_directory(*job)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for log in executor.map(_process_wordcloud_job, jobs):
+                print(log, end='')
 
 def gen_wordcloud_main(root_directory="."):
     """Generate word clouds for abstracts in documents"""
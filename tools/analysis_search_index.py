@@ -1,49 +1,48 @@
 import yaml
+import json
 from datetime import datetime
-from collections import defaultdict
+from collections import Counter
+from itertools import chain
 import argparse
 import os
 
 def load_search_index(filepath='search_index.yml'):
+    # Prefer the JSON copy written by gen_search_index; it parses much faster
+    if filepath.endswith('.json'):
+        with open(filepath, 'rb') as f:
+            return json.loads(f.read())
     with open(filepath, 'r', encoding='utf-8') as f:
         return yaml.safe_load(f)
 
-def analyze_index(input_file='search_index.yml', output_file=None):
-    index = load_search_index(input_file)
-    
-    # Track statistics
-    year_counts = defaultdict(int)
-    tag_counts = defaultdict(int)
-    region_counts = defaultdict(int)
-    
-    # Process each entry
-    for path, metadata in index.items():
-        # Normalize date
-        date = metadata.get('date')
+def analyze(index):
+    """
+    Compute year, tag and region summaries for an already-parsed search index.
 
-        # Update year counts
-        if date != '未知':
-            year = date[:4]
-            year_counts[year] += 1
-            
-        # Count tags
-        tags = metadata.get('tags', [])
-        if isinstance(tags, list):
-            for tag in tags:
-                tag_counts[tag] += 1
-                
-        # Count regions
-        region = metadata.get('region', '未知')
-        region_counts[region] += 1
+    Callers that need several analyses of the same index can parse it once
+    with load_search_index and pass the result here.
+    """
+    entries = index.values()
+
+    # Track statistics; Counter does the counting loop in C
+    year_counts = Counter(
+        metadata['date'][:4] for metadata in entries
+        if metadata.get('date') and metadata['date'] != '未知'
+    )
+    tag_counts = Counter(chain.from_iterable(
+        metadata['tags'] for metadata in entries
+        if isinstance(metadata.get('tags'), list)
+    ))
+    region_counts = Counter(metadata.get('region', '未知') for metadata in entries)
     
     # Create output dictionary
-    analysis_results = {
+    return {
         'year_summary': dict(sorted(year_counts.items())),
         'tag_summary': dict(sorted(tag_counts.items(), key=lambda x: (-x[1], x[0]))),
         'region_summary': dict(sorted(region_counts.items(), key=lambda x: (-x[1], x[0])))
     }
 
-    # Either print to console or save to file
+def report_analysis(analysis_results, output_file=None):
+    """Save analysis results to a YAML file, or print them to the console."""
     if output_file:
         with open(output_file, 'w', encoding='utf-8') as f:
             yaml.dump(analysis_results, f, allow_unicode=True)
@@ -60,9 +59,19 @@ def analyze_index(input_file='search_index.yml', output_file=None):
         for region, count in analysis_results['region_summary'].items():
             print(f"{region}: {count} files")
 
+def analyze_index(input_file='search_index.yml', output_file=None, index=None):
+    """Analyze a search index, loading it from input_file unless index is given."""
+    if index is None:
+        index = load_search_index(input_file)
+    analysis_results = analyze(index)
+    report_analysis(analysis_results, output_file)
+    return analysis_results
+
 def analysis_search_index_main(root_directory="."):
     """Analyze search index and generate statistics"""
-    input_file = os.path.join(root_directory, "search_index.yml")
+    input_file = os.path.join(root_directory, "search_index.json")
+    if not os.path.exists(input_file):
+        input_file = os.path.join(root_directory, "search_index.yml")
     output_file = os.path.join(root_directory, "search_index_analysis.yml")
     analyze_index(input_file, output_file)
     return output_file
@@ -70,7 +79,7 @@ def analysis_search_index_main(root_directory="."):
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Analyze search index YAML file')
     parser.add_argument('-i', '--input', default='search_index.yml',
-                        help='Input YAML file path (default: search_index.yml)')
+                        help='Input YAML or JSON file path (default: search_index.yml)')
     parser.add_argument('-o', '--output',
                         help='Output YAML file path (optional, prints to console if not specified)')
 